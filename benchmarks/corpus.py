@@ -0,0 +1,53 @@
+"""
+Synthetic Python modules for measuring inference, limited to the statements and
+expressions `constraintgen` handles: function definitions, single-target assignments,
+returns, names, numbers and multiplication. There are no calls, so functions refer to
+one another by assigning an earlier function to a local.
+
+Each of `functions` functions takes two arguments and has `assignments` assignments, each
+of a chain of `depth` multiplications of numbers, earlier locals and the arguments (just
+one of them with a depth of 0), then `references` assignments of earlier functions, and
+finally returns its last local.
+
+    python -m benchmarks.corpus [functions] [assignments] [depth] [references] [seed]
+"""
+
+import sys
+import random
+
+def operand(rng, names):
+    if not names or rng.random() < 0.2:
+        return rng.choice(['3', '3.0', '7'])
+    return rng.choice(names)
+
+def expression(rng, names, depth):
+    "A chain of `depth` multiplications, which parses left-nested so its depth does not hit the parser's nesting limit"
+    return ' * '.join(operand(rng, names) for _ in xrange(depth + 1))
+
+def function(rng, index, assignments, depth, references):
+    names = ['a', 'b']
+    lines = ['def f%d(a, b):' % index]
+    for i in xrange(assignments):
+        local = 'x%d' % i
+        lines.append('    %s = %s' % (local, expression(rng, names, depth)))
+        names.append(local)
+
+    if index > 0:
+        for i in xrange(references):
+            lines.append('    r%d = f%d' % (i, rng.randrange(index)))
+
+    lines.append('    return %s' % names[-1])
+    return '\n'.join(lines)
+
+def synthetic_module(functions=20, assignments=20, depth=2, references=2, seed=0):
+    '''
+    The source of a module of `functions` functions with `assignments` numeric assignments
+    each, whose right-hand sides are chains of `depth` multiplications, and with
+    `references` assignments of earlier functions each. The same arguments and `seed`
+    always give the same module.
+    '''
+    rng = random.Random(seed)
+    return '\n\n'.join(function(rng, i, assignments, depth, references) for i in xrange(functions)) + '\n'
+
+if __name__ == '__main__':
+    print synthetic_module(*[int(arg) for arg in sys.argv[1:]]),
@@ -0,0 +1,63 @@
+"""
+Checks per second for nested annotations, walking the Type tree with `enforce`
+versus running the checker built by `compile`, both copying (the default) and
+validate-only (`copy=False`). Then repeated checks of the same immutable value with and
+without a CheckCache.
+
+    python -m benchmarks.enforcement [seconds-per-case]
+"""
+
+import sys
+import array
+import time
+import logging
+from collections import namedtuple
+
+from rightarrow.parser import Parser
+from rightarrow.cache import CheckCache
+from rightarrow.enforce import check
+from rightarrow.annotations import Object, any_t
+
+def payload(width):
+    return [{'key%d' % i: [j for j in range(width)] for i in range(width)} for _ in range(width)]
+
+cases = [
+    ('int', 3),
+    ('[int]', range(1000)),
+    ('[{str: [int]}]', payload(10)),
+    ('[[[[float]]]]', [[[[1.5] * 10] * 10] * 10] * 10),
+    ('{str: [int|str]}', {'key%d' % i: [i, str(i)] * 50 for i in range(20)}),
+    ('[int|long|float|complex|str|unicode]', [u'x'] * 1000),
+    ('[[int]|[str]|[unicode]]', [[u'x'] * 100] * 10),
+    ('[float]', array.array('d', [1.5] * 100000)),
+]
+
+def checks_per_second(check, val, duration):
+    count = 0
+    start = time.time()
+    while time.time() - start < duration:
+        check(val)
+        count += 1
+    return count / (time.time() - start)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    print '%-40s%15s%15s%10s%15s' % ('annotation', 'enforce/s', 'compiled/s', 'speedup', 'validate/s')
+    for string, val in cases:
+        ty = Parser().parse(string)
+        before = checks_per_second(ty.enforce, val, duration)
+        after = checks_per_second(ty.compile(), val, duration)
+        validated = checks_per_second(ty.compile(copy=False), val, duration)
+        print '%-40s%15.1f%15.1f%9.1fx%15.1f' % (string, before, after, after / before, validated)
+
+    print
+    print '%-40s%15s%15s' % ('annotation', 'check/s', 'cached/s')
+    Config = namedtuple('Config', ['field%d' % i for i in range(20)])
+    config = Config(*[(u'value', i) for i in range(20)])
+    for ty in [Parser().parse('??'), Parser().parse('object(self, field0: ??)'), Object('self', **dict((field, any_t) for field in Config._fields))]:
+        cache = CheckCache()
+        uncached = checks_per_second(lambda val: check(ty, val, copy=False), config, duration)
+        cached = checks_per_second(lambda val: check(ty, val, copy=False, cache=cache), config, duration)
+        print '%-40s%15.1f%15.1f' % (str(ty)[:38], uncached, cached)
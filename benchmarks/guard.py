@@ -0,0 +1,70 @@
+"""
+Per-call overhead of guarded functions compared with the undecorated function,
+through the compiled call plan with and without signature preservation. Then the overhead of polymorphic
+signatures `(~a1, ..., ~aN, [~a1]) -> ~a1` as the number of type variables grows, which
+should stay linear in the number of arguments. Finally the overhead per item of
+consuming a guarded generator function.
+
+    python -m benchmarks.guard [calls]
+"""
+
+import sys
+import timeit
+import logging
+
+from rightarrow.parser import Parser
+
+def add(x, y):
+    return x + y
+
+def first(x, y, z):
+    return x
+
+cases = [
+    ('(int, int) -> int', add, (1, 2)),
+    ('(int, ??, ??) -> ??', first, (1, 'b', None)),
+    ('([int], [int]) -> [int]', add, ([1, 2], [3])),
+]
+
+def count_to(n):
+    for i in xrange(n):
+        yield i
+
+def polymorphic_case(n):
+    variables = ['~a%d' % i for i in range(1, n + 1)]
+    annotation = '(%s, [~a1]) -> ~a1' % ', '.join(variables)
+    args = tuple(range(n)) + ([1, 2, 3],)
+    return annotation, lambda *args: args[0], args
+
+def microseconds_per_call(f, args, calls):
+    return timeit.timeit(lambda: f(*args), number=calls) / calls * 1e6
+
+def microseconds_per_item(generator_function, items):
+    return timeit.timeit(lambda: sum(generator_function(items)), number=1) / items * 1e6
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print '%-28s%10s%14s%14s' % ('annotation', 'bare us', 'compiled +us', 'unsigned +us')
+    for string, f, args in cases:
+        ty = Parser().parse(string)
+        baseline = microseconds_per_call(f, args, calls)
+        variants = [ty.compile()(f), ty.compile(preserve_signature=False)(f)]
+        overheads = [microseconds_per_call(g, args, calls) - baseline for g in variants]
+        print '%-28s%10.2f%14.2f%14.2f' % tuple([string, baseline] + overheads)
+
+    print
+    print '%-10s%14s%14s' % ('variables', 'guarded +us', 'per var +us')
+    for n in range(1, 11):
+        string, f, args = polymorphic_case(n)
+        baseline = microseconds_per_call(f, args, calls)
+        overhead = microseconds_per_call(Parser().parse(string).compile()(f), args, calls) - baseline
+        print '%-10d%14.2f%14.2f' % (n, overhead, overhead / n)
+
+    print
+    print '%-28s%10s%14s' % ('annotation', 'bare us', 'per item +us')
+    for string in ['int -> iter[int]', 'int -> iter[int|str]', 'int -> iter[??]']:
+        baseline = microseconds_per_item(count_to, calls)
+        overhead = microseconds_per_item(Parser().parse(string).compile()(count_to), calls) - baseline
+        print '%-28s%10.2f%14.2f' % (string, baseline, overhead)
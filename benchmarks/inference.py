@@ -0,0 +1,94 @@
+"""
+How constraint generation and solving scale with each dimension of the synthetic modules
+from `benchmarks.corpus`: the number of functions, assignments per function, multiplications
+per assignment and references to earlier functions. Each dimension is doubled in turn while
+the others keep their defaults. Next to the seconds and peak memory of each phase is the
+exponent of its growth since the previous row: about 1 for linear work, 2 for quadratic.
+
+Python 2 has no tracemalloc, so peak memory is the growth of the maximum resident set size
+(`resource.getrusage`) while the phase runs, in a process forked for it alone so that
+earlier phases and rows do not hide it. Solving the constraints of multiplications is
+usually stumped, as their results only have an upper bound; that counts as finishing.
+
+    python -m benchmarks.inference [doublings]
+"""
+
+import ast
+import sys
+import math
+import time
+import logging
+import resource
+import multiprocessing
+
+from rightarrow import constraintgen
+from rightarrow.annotations import VariableSupply
+from rightarrow.constraintsolve import solve, Stumped
+
+from benchmarks.corpus import synthetic_module
+
+defaults = dict(functions=20, assignments=20, depth=2, references=2)
+
+dimensions = [
+    ('functions', 10),
+    ('assignments', 10),
+    ('depth', 1),
+    ('references', 1),
+]
+
+def generate(module):
+    return constraintgen.constraints(module, supply=VariableSupply()).constraints
+
+def solved(constraints):
+    try:
+        return solve(constraints)
+    except Stumped as e:
+        return e.substitution
+
+def measure(f, *args):
+    '''
+    Seconds and peak growth of the resident set, in MB, of `f(*args)` run in a forked
+    process, which inherits `args` instead of having them pickled.
+    '''
+    queue = multiprocessing.Queue()
+
+    def run():
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        f(*args)
+        seconds = time.time() - start
+        queue.put((seconds, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024.0))
+
+    process = multiprocessing.Process(target=run)
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def exponent(previous, current, ratio=2.0):
+    if previous is None or previous <= 0 or current <= 0:
+        return float('nan')
+    return math.log(current / previous) / math.log(ratio)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    doublings = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+    header = '%-12s%8s%10s%13s%10s%10s%8s%10s%10s%8s'
+    row = '%-12s%8d%10d%13d%10.3f%10.1f%8.2f%10.3f%10.1f%8.2f'
+    print header % ('dimension', 'value', 'lines', 'constraints', 'gen s', 'gen MB', 'gen ^', 'solve s', 'solve MB', 'solve ^')
+    for dimension, start in dimensions:
+        previous = None
+        for value in [start * 2 ** i for i in xrange(doublings)]:
+            options = dict(defaults, **{dimension: value})
+            source = synthetic_module(**options)
+            module = ast.parse(source)
+            gen_seconds, gen_mb = measure(generate, module)
+            constraints = generate(module)
+            solve_seconds, solve_mb = measure(solved, constraints)
+            print row % (dimension, value, source.count('\n'), len(constraints), gen_seconds, gen_mb,
+                         exponent(previous and previous[0], gen_seconds), solve_seconds, solve_mb,
+                         exponent(previous and previous[1], solve_seconds))
+            sys.stdout.flush()
+            previous = gen_seconds, solve_seconds
+        print
@@ -0,0 +1,63 @@
+"""
+Time and allocations for checking a list of objects, as with rows from an ORM, and then
+reading every annotated field, under each of the ways objects can be checked: copying
+(the default), validating (`copy=False`), in place (`in_place=True`) and through proxies
+(`lazy=True`).
+
+Python 2 has no tracemalloc, so allocations are counted as the objects the garbage
+collector tracks that are still alive while the checked list is held: copies, their
+attribute dicts, wrapped functions and proxies.
+
+    python -m benchmarks.objects [rows]
+"""
+
+import gc
+import sys
+import time
+import logging
+
+from rightarrow.annotations import Object, List, Function, int_t, str_t
+
+def increment(x):
+    return x + 1
+
+class Row(object):
+    def __init__(self, id, name, key):
+        self.id = id
+        self.name = name
+        self.key = key
+
+plain = List(Object('self', id=int_t, name=str_t))
+wrapping = List(Object('self', id=int_t, key=Function([int_t], int_t)))
+
+modes = [
+    ('copy', {}),
+    ('validate', dict(copy=False)),
+    ('in place', dict(in_place=True)),
+    ('proxy', dict(lazy=True)),
+]
+
+def measure(ty, check, rows):
+    fields = ty.elem_ty.field_tys.keys()
+    gc.collect()
+    before = len(gc.get_objects())
+    start = time.time()
+    checked = check(rows)
+    for row in checked:
+        for field in fields:
+            getattr(row, field)
+    elapsed = time.time() - start
+    allocated = len(gc.get_objects()) - before
+    del checked
+    return elapsed, allocated
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print '%-45s%-12s%12s%15s' % ('annotation', 'mode', 'seconds', 'gc objects')
+    for ty in [plain, wrapping]:
+        for mode, options in modes:
+            rows = [Row(i, 'row%d' % i, increment) for i in xrange(count)]
+            elapsed, allocated = measure(ty, ty.compile(**options), rows)
+            print '%-45s%-12s%12.3f%15d' % (ty, mode, elapsed, allocated)
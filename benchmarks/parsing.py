@@ -0,0 +1,47 @@
+"""
+Parses per second for a handful of annotations, with the process-wide PLY tables
+(the default) and with the tables and master lexer rebuilt on every parse, which is
+how every parse used to behave.
+
+    python -m benchmarks.parsing [seconds-per-case]
+"""
+
+import sys
+import time
+import logging
+
+from rightarrow import lexer, parser
+from rightarrow.parser import Parser
+
+annotations = [
+    'int',
+    '[{str: [int]}]',
+    '(int, *[str], **{str: float}) -> [~a]',
+    'object(self, foo: int|long|[str] -> unicode)',
+]
+
+def uncached_parse(string):
+    parser._ply_parsers.clear()
+    lexer._master_lexers.clear()
+    return Parser().parse(string)
+
+def cached_parse(string):
+    return Parser().parse(string)
+
+def parses_per_second(parse, string, duration):
+    count = 0
+    start = time.time()
+    while time.time() - start < duration:
+        parse(string)
+        count += 1
+    return count / (time.time() - start)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    print '%-55s%15s%15s%10s' % ('annotation', 'uncached/s', 'cached/s', 'speedup')
+    for string in annotations:
+        before = parses_per_second(uncached_parse, string, duration)
+        after = parses_per_second(cached_parse, string, duration)
+        print '%-55s%15.1f%15.1f%9.1fx' % (string, before, after, after / before)
@@ -0,0 +1,56 @@
+"""
+Seconds to solve the constraints of synthetic programs: long runs of assignments in
+which each variable is assigned a literal or another variable defined earlier, so the
+constraints form chains and trees between type variables. The constraints are shuffled,
+so that most are met before the ones they depend on. Compares the union-find
+`solve` with the worklist solver behind `solve_by_substitution`, whose counters show
+how many constraints it reconciled and woke up again, and then the same after the
+constraints are normalized (timing normalization and solving together).
+
+    python -m benchmarks.solving [max-statements]
+"""
+
+import ast
+import sys
+import time
+import random
+import logging
+
+from rightarrow import constraintgen
+from rightarrow.annotations import VariableSupply
+from rightarrow.constraintsolve import solve, WorklistSolver
+from rightarrow.normalize import Normalizer
+
+def synthetic_program(statements, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in xrange(statements):
+        if i == 0 or rng.random() < 0.05:
+            lines.append('x%d = %s' % (i, rng.choice(['3', '"three"', '3.0'])))
+        else:
+            lines.append('x%d = x%d' % (i, rng.randrange(max(0, i - 100), i)))
+    return '\n'.join(lines)
+
+def seconds(solver, constraints):
+    start = time.time()
+    solver(constraints)
+    return time.time() - start
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+
+    print '%12s%14s%14s%16s%12s%12s%12s%20s%23s' % ('statements', 'constraints', 'solve s', 'worklist s', 'reconciles', 'wakeups',
+                                                   'normalized', 'normalized solve s', 'normalized worklist s')
+    statements = 1000
+    while statements <= limit:
+        program = ast.parse(synthetic_program(statements))
+        constraints = constraintgen.constraints(program, supply=VariableSupply()).constraints
+        random.Random(statements).shuffle(constraints)
+        worklist = WorklistSolver()
+        normalizer = Normalizer()
+        print '%12d%14d%14.3f%16.3f%12d%12d%12d%20.3f%23.3f' % (statements, len(constraints), seconds(solve, constraints),
+                                                               seconds(worklist.solve, constraints), worklist.reconcile_calls, worklist.wakeups,
+                                                               len(normalizer.normalize(constraints)), seconds(Normalizer().solve, constraints),
+                                                               seconds(lambda cs: Normalizer().solve(cs, solver=WorklistSolver().solve), constraints))
+        statements *= 2
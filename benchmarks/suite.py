@@ -0,0 +1,166 @@
+"""
+The whole runtime enforcement path as one suite of named cases: lexing and parsing
+annotations of growing size, `check` over primitives, nested `[{str: [int]}]` payloads of
+10 to 10^6 elements, unions and objects, and calls of mono- and polymorphic guarded
+functions. Each case is timed as the best of a few repeats, in seconds per call.
+
+Results are written as JSON with `--output`. With `--baseline` the run is compared against
+results saved earlier, and the exit status is 1 if any case got slower than its baseline
+by more than `--threshold` (a fraction, 0.25 by default). Patterns select cases by name.
+
+    python -m benchmarks.suite [--quick] [--output FILE] [--baseline FILE] [--threshold T] [pattern ...]
+"""
+
+import sys
+import json
+import time
+import timeit
+import fnmatch
+import logging
+import platform
+import argparse
+
+from rightarrow.lexer import Lexer
+from rightarrow.parser import Parser
+from rightarrow.enforce import check, guard
+from rightarrow.annotations import Object, List, int_t, str_t, any_t
+
+def nested_annotation(n):
+    return '[{str: ' * n + 'int' + '}]' * n
+
+def payload(elements):
+    "A value of type [{str: [int]}] with about `elements` ints, spread evenly over three levels"
+    width = max(1, int(round(elements ** (1 / 3.0))))
+    length = max(1, elements // (width * width))
+    return [dict(('key%d' % i, range(length)) for i in range(width)) for _ in range(width)]
+
+class Row(object):
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+def lex_case(string):
+    return lambda: list(Lexer().tokenize(string))
+
+def parse_case(string):
+    return lambda: Parser().parse(string)
+
+def check_case(ty, val, **options):
+    return lambda: check(ty, val, **options)
+
+def guard_case(annotation, f, args):
+    guarded = guard(annotation)(f)
+    return lambda: guarded(*args)
+
+def polymorphic_guard_case(n):
+    variables = ['~a%d' % i for i in range(1, n + 1)]
+    return guard_case('(%s, [~a1]) -> ~a1' % ', '.join(variables), lambda *args: args[0], tuple(range(n)) + ([1, 2, 3],))
+
+def cases(max_elements):
+    '''
+    The cases of the suite as (name, setup) pairs, where calling `setup` builds the
+    function to time. Setup is deferred so that unselected cases cost nothing.
+    '''
+    for n in [1, 10, 100]:
+        string = '|'.join(['int', 'str', '[float]', '{str: unicode}'] * n)
+        yield 'lex/union-%d' % (4 * n), lambda string=string: lex_case(string)
+        yield 'parse/union-%d' % (4 * n), lambda string=string: parse_case(string)
+
+    for n in [1, 10, 50]:
+        yield 'parse/nested-%d' % n, lambda n=n: parse_case(nested_annotation(n))
+
+    yield 'check/int', lambda: check_case('int', 3)
+    yield 'check/str', lambda: check_case('str', 'three')
+    yield 'check/float', lambda: check_case('float', 3.0)
+    yield 'check/any', lambda: check_case('??', object())
+
+    elements = 10
+    while elements <= max_elements:
+        yield 'check/payload-%d' % elements, lambda elements=elements: check_case('[{str: [int]}]', payload(elements))
+        yield 'validate/payload-%d' % elements, lambda elements=elements: check_case('[{str: [int]}]', payload(elements), copy=False)
+        elements *= 10
+
+    yield 'check/union-first', lambda: check_case('[int|long|float|complex|str|unicode]', [1] * 1000)
+    yield 'check/union-last', lambda: check_case('[int|long|float|complex|str|unicode]', [u'x'] * 1000)
+    yield 'check/union-lists', lambda: check_case('[[int]|[str]|[unicode]]', [[u'x'] * 100] * 10)
+
+    rows = [Row(i, 'row%d' % i) for i in range(1000)]
+    yield 'check/objects-copy', lambda: check_case(List(Object('self', id=int_t, name=str_t)), rows)
+    yield 'check/objects-validate', lambda: check_case(List(Object('self', id=int_t, name=str_t)), rows, copy=False)
+    yield 'check/objects-lazy', lambda: check_case(List(Object('self', id=int_t, name=any_t)), rows, lazy=True)
+
+    yield 'guard/mono', lambda: guard_case('(int, int) -> int', lambda x, y: x + y, (1, 2))
+    yield 'guard/mono-lists', lambda: guard_case('([int], [int]) -> [int]', lambda x, y: x + y, ([1, 2], [3]))
+    for n in [1, 5, 10]:
+        yield 'guard/poly-%d' % n, lambda n=n: polymorphic_guard_case(n)
+
+def seconds_per_call(f, budget, repeat=3):
+    "The best of `repeat` timings of `f`, each running it as often as fits in `budget` seconds overall"
+    number = 1
+    elapsed = timeit.timeit(f, number=number)
+    while elapsed * 10 * repeat < budget:
+        number *= 10
+        elapsed = timeit.timeit(f, number=number)
+    return min([elapsed] + timeit.repeat(f, number=number, repeat=repeat - 1)) / number
+
+def run(patterns, max_elements, budget):
+    results = {}
+    for name, setup in cases(max_elements):
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        seconds = seconds_per_call(setup(), budget)
+        results[name] = seconds
+        print '%-32s%14.2f us' % (name, seconds * 1e6)
+        sys.stdout.flush()
+    return results
+
+def compare(results, baseline, threshold):
+    "Prints each case against the baseline and returns the names of those that regressed beyond `threshold`"
+    regressions = []
+    print
+    print '%-32s%14s%14s%10s' % ('case', 'baseline us', 'current us', 'ratio')
+    for name in sorted(set(results) | set(baseline)):
+        if name not in baseline or name not in results:
+            print '%-32s%14s%14s' % (name, '-' if name not in baseline else '%.2f' % (baseline[name] * 1e6),
+                                     '-' if name not in results else '%.2f' % (results[name] * 1e6))
+            continue
+
+        ratio = results[name] / baseline[name]
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSED'
+        print '%-32s%14.2f%14.2f%9.2fx%s' % (name, baseline[name] * 1e6, results[name] * 1e6, ratio, flag)
+    return regressions
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Time the runtime enforcement suite, optionally against a baseline')
+    argparser.add_argument('patterns', nargs='*', help='only run the cases whose names match one of these shell patterns')
+    argparser.add_argument('--output', '-o', help='write the results to this JSON file')
+    argparser.add_argument('--baseline', '-b', help='compare against the results in this JSON file')
+    argparser.add_argument('--threshold', '-t', type=float, default=0.25, help='the slowdown, as a fraction, counted as a regression (default: 0.25)')
+    argparser.add_argument('--budget', type=float, default=0.5, help='seconds to spend timing each case (default: 0.5)')
+    argparser.add_argument('--quick', action='store_true', help='stop the payloads at 10^4 elements and time each case for 0.1s')
+    args = argparser.parse_args(argv)
+
+    budget = 0.1 if args.quick else args.budget
+    results = run(args.patterns, 10 ** 4 if args.quick else 10 ** 6, budget)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(dict(python=platform.python_version(), machine=platform.machine(), time=time.time(), results=results),
+                      fh, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print
+            print '%d of %d cases regressed by more than %d%%: %s' % (len(regressions), len(results), args.threshold * 100, ', '.join(regressions))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    sys.exit(main())
@@ -1,7 +1,17 @@
 import copy
+import types
+import inspect
+import weakref
+import functools
+import threading
+from itertools import islice
 from collections import namedtuple, defaultdict
 
-from decorator import decorator
+from decorator import FunctionMaker
+
+from rightarrow.errors import TypeCheckError
+from rightarrow.lazy import LazyList, LazyDict, LazyObject, CheckedIterator
+from rightarrow.buffers import buffer_types, buffer_layout
 
 # Kinds
 
@@ -21,11 +31,212 @@ class FunctionKind(Kind):
         
 ## Types proper
 
-class Type(object): pass
+# Every type in existence, keyed by its class and fields; see `Type`
+interned_types = weakref.WeakValueDictionary()
+interned_types_lock = threading.Lock()
+
+def hash_cons(cls, *values):
+    "The type of class `cls` with the given field values, creating it only if no equal type exists yet"
+    key = (cls,) + values
+    with interned_types_lock:
+        ty = interned_types.get(key)
+        if ty is None:
+            ty = object.__new__(cls)
+            for field, value in zip(cls.fields, values):
+                object.__setattr__(ty, field, value)
+            object.__setattr__(ty, '_hash', hash(key))
+            interned_types[key] = ty
+    return ty
+
+class Type(object):
+    '''
+    Types are immutable and hash-consed: constructing a type structurally equal to one that
+    already exists hands back the existing object. So equality is identity, the structural
+    hash is computed once at construction, and types can key dicts and sets. Each subclass
+    lists its structure in `fields` and builds itself in `__new__` through `hash_cons`.
+    '''
+
+    __slots__ = ['_hash', '_checkers', '__weakref__']
+    fields = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (hash_cons, (type(self),) + tuple(getattr(self, field) for field in self.fields))
+
+    def free_variables(self):
+        "The names of the type variables occurring in this type"
+        return set()
+
+    def validate(self, val):
+        '''
+        Like `enforce`, but returns `val` itself rather than a copy whenever nothing inside it
+        had to be wrapped; containers are only rebuilt around the elements that changed.
+        '''
+        return self.enforce(val)
+
+    def compile(self, **options):
+        '''
+        Returns a checker: a function that behaves like `self.enforce` but has had as much
+        of the work as possible (walking this type, picking out primitive checks) done up front.
+        Types without a specialized form simply hand back `enforce` or `validate`.
+
+        The options are passed down to the checkers of every nested type:
+
+         - copy: when false, behave like `self.validate` instead (default true)
+         - lazy: when true, lists and dicts are checked element by element as they are
+           read, through a LazyList or LazyDict view, and objects field by field through
+           a LazyObject proxy (default false)
+         - in_place: when true, objects are never copied; fields that come back wrapped
+           are assigned onto the checked object itself (default false)
+         - sample: a `rightarrow.sampling.Sampling` policy choosing which elements of
+           each list and dict get checked (default: all of them)
+         - preserve_signature: when false, checked functions are plain `functools.wraps`
+           wrappers rather than copies of the original signature, which saves a call
+           per invocation (default true)
+        '''
+        return self.enforce if options.get('copy', True) else self.validate
+
+    def dispatch_types(self):
+        '''
+        The set of Python types that values passing this type must have exactly (as in
+        `type(val) is t`), or None if that is not known ahead of time. Unions use this to
+        go straight to the alternatives that can possibly accept a value.
+        '''
+        return None
+
+    def compile_bound(self, **options):
+        '''
+        Like `compile`, but the checker also takes the type variable bindings of the current
+        call to the enclosing polymorphic function, as `check(val, bindings)`. A variable is
+        bound to the Python type of the first value it meets and checks later values against
+        that, so each argument is checked exactly once. Types mentioning no variables ignore
+        the bindings.
+        '''
+        check = self.compile(**options)
+        return lambda val, bindings: check(val)
+
+    def checker(self, **options):
+        '''
+        The result of `compile`, memoized on this type for each combination of options. With
+        a `sample` policy, which is usually made afresh for each check, the checker is
+        compiled anew instead of being kept, and each use of it is a round of the policy.
+        '''
+        if options.get('sample') is not None:
+            return options['sample'].top_level(self.compile(**options))
+
+        try:
+            checkers = self._checkers
+        except AttributeError:
+            checkers = {}
+            object.__setattr__(self, '_checkers', checkers)
+
+        key = tuple(sorted(options.items()))
+        try:
+            return checkers[key]
+        except KeyError:
+            checkers[key] = self.compile(**options)
+            return checkers[key]
+
+def check_elements(check_elem, val, start=0):
+    "Applies `check_elem` to the elements of `val` from index `start` on, blaming a failure on the index of its element"
+    try:
+        return [check_elem(x) for x in (val[start:] if start else val)]
+    except TypeCheckError:
+        # Rather than tracking the index on the common path, look for the culprit again
+        for i in xrange(start, len(val)):
+            try:
+                check_elem(val[i])
+            except TypeCheckError as e:
+                e.at('index', i)
+                raise
+        raise
+
+def check_items(check_key, check_value, items):
+    "Applies the checkers to each (key, value) pair, blaming a failure on the key of its pair"
+    try:
+        return [(check_key(key), check_value(value)) for key, value in items]
+    except TypeCheckError:
+        for key, value in items:
+            try:
+                check_key(key)
+                check_value(value)
+            except TypeCheckError as e:
+                e.at('key', key)
+                raise
+        raise
+
+def identity_index(val, x):
+    "The index of the element of `val` that is `x` itself"
+    for i, y in enumerate(val):
+        if y is x:
+            return i
+
+def copy_on_write_list(check_elem, val):
+    "Applies `check_elem` to each element, returning `val` itself unless some element comes back changed"
+    for i, x in enumerate(val):
+        try:
+            checked = check_elem(x)
+        except TypeCheckError as e:
+            e.at('index', i)
+            raise
+        if checked is not x:
+            return val[:i] + [checked] + check_elements(check_elem, val, start=i+1)
+    return val
+
+def copy_on_write_dict(check_key, check_value, val):
+    "Applies the checkers to each item, returning `val` itself unless some key or value comes back changed"
+    items = val.iteritems()
+    for i, (key, value) in enumerate(items):
+        try:
+            checked_key = check_key(key)
+            checked_value = check_value(value)
+        except TypeCheckError as e:
+            e.at('key', key)
+            raise
+        if checked_key is not key or checked_value is not value:
+            result = dict(islice(val.iteritems(), i))
+            result[checked_key] = checked_value
+            result.update(check_items(check_key, check_value, list(items)))
+            return result
+    return val
+
+# The Python types that the primitive named types are checked against
+primitive_types = {
+    'int': int,
+    'long': long,
+    'float': float,
+    'complex': complex,
+    'str': str,
+    'unicode': unicode,
+}
+
+def accepts_any_of(ty, python_types):
+    "Whether `ty` accepts values of one of the given Python types, judging from the types alone"
+    if isinstance(ty, Any):
+        return True
+    elif isinstance(ty, NamedType):
+        return primitive_types.get(ty.name) in python_types
+    elif isinstance(ty, Union):
+        return any(accepts_any_of(alternative, python_types) for alternative in ty.alternatives())
+    else:
+        return False
 
 class NamedType(Type):
-    def __init__(self, name):
-        self.name = name
+    __slots__ = fields = ('name',)
+
+    def __new__(cls, name):
+        return hash_cons(cls, name)
 
     def substitute(self, substitution):
         return self
@@ -33,9 +244,6 @@ class NamedType(Type):
     def __str__(self):
         return self.name
 
-    def __eq__(self, other):
-        return isinstance(other, NamedType) and other.name == self.name
-
     def enforce(self, val):
         # TODO: Is it worth the boilerplate to have IntType, etc, and all primitives inherit and override here?
         # and yes, this does look a lot like how these types already work, but I want to leave the possibility
@@ -44,14 +252,35 @@ class NamedType(Type):
             if type(val).__name__ == self.name:
                 return val
             else:
-                raise TypeError('Type check failed: %s does not have type %s' % (val, self))
+                raise TypeCheckError(self, val)
         else:
             return False # TODO: when we actually have nominal (abstract) types, do some check here
 
+    def validate(self, val):
+        return self.enforce(val)
+
+    def dispatch_types(self):
+        python_type = primitive_types.get(self.name)
+        return None if python_type is None else set([python_type])
+
+    def compile(self, **options):
+        python_type = primitive_types.get(self.name)
+        if python_type is None:
+            return lambda val: False # Mirrors `enforce`, see the TODO there
+
+        def check_named(val):
+            if type(val) is python_type:
+                return val
+            else:
+                raise TypeCheckError(self, val)
+        return check_named
+
 # TODO: Make into a higher-kinded type? Maybe that's just a headache?
 class List(Type):
-    def __init__(self, elem_ty):
-        self.elem_ty = elem_ty
+    __slots__ = fields = ('elem_ty',)
+
+    def __new__(cls, elem_ty):
+        return hash_cons(cls, elem_ty)
 
     def substitute(self, substitution):
         return List(self.elem_ty.substitute(substitution))
@@ -59,20 +288,175 @@ class List(Type):
     def __str__(self):
         return '[%s]' % self.elem_ty
 
-    def __eq__(self, other):
-        return isinstance(other, List) and other.elem_ty == self.elem_ty
+    def free_variables(self):
+        return self.elem_ty.free_variables()
 
     def enforce(self, val):
         if type(val) != list:
-            raise TypeError('Type check failed: %s is not a list %s' % (val, self))
+            return self.check_buffer(val)
+        else:
+            return check_elements(self.elem_ty.enforce, val) # This could be slooooow
+
+    def validate(self, val):
+        if type(val) != list:
+            return self.check_buffer(val)
+        else:
+            return copy_on_write_list(self.elem_ty.validate, val)
+
+    def check_buffer(self, val):
+        '''
+        Checks a value that is not a list, which passes only if it is a buffer (see
+        `rightarrow.buffers`) with a dimension for each level of nested list in this type
+        and an element type that the innermost element type accepts. Passing buffers are
+        handed back as they are, whatever the options.
+        '''
+        layout = buffer_layout(val)
+        if layout is None:
+            raise TypeCheckError(self, val, '%(val)s is not a list %(ty)s')
+
+        dimensions, python_types = layout
+        depth, elem_ty = 1, self.elem_ty
+        while isinstance(elem_ty, List):
+            depth, elem_ty = depth + 1, elem_ty.elem_ty
+
+        if depth != dimensions:
+            raise TypeCheckError(self, val, '%%(val)s has %d dimensions, not the %d of %%(ty)s' % (dimensions, depth))
+        if not accepts_any_of(elem_ty, python_types):
+            raise TypeCheckError(self, val, '%(val)s does not have elements of the type %(ty)s requires')
+        return val
+
+    def dispatch_types(self):
+        return set([list] + buffer_types)
+
+    def compile(self, **options):
+        elem_ty = self.elem_ty
+        copy = options.get('copy', True)
+        finish = list if copy else lambda val: val
+
+        if options.get('lazy'):
+            check_elem = elem_ty.compile(**options)
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                return LazyList(val, check_elem, self)
+
+        elif options.get('sample') is not None:
+            sample = options['sample']
+            check_elem = elem_ty.compile(**options)
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                return sample.check_list(check_elem, val, copy=copy)
+
+        elif isinstance(elem_ty, Any):
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                return finish(val)
+
+        elif isinstance(elem_ty, NamedType) and elem_ty.name in primitive_types:
+            # Elements come back unchanged, so check them inline rather than calling a checker per element
+            python_type = primitive_types[elem_ty.name]
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                for x in val:
+                    if type(x) is not python_type:
+                        raise TypeCheckError(elem_ty, x).at('index', identity_index(val, x))
+                return finish(val)
+
+        elif copy:
+            check_elem = elem_ty.compile(**options)
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                return check_elements(check_elem, val)
+
         else:
-            return [self.elem_ty.enforce(x) for x in val] # This could be slooooow
+            check_elem = elem_ty.compile(**options)
+            def check_list(val):
+                if type(val) is not list:
+                    return self.check_buffer(val)
+                return copy_on_write_list(check_elem, val)
+
+        return check_list
+
+    def compile_bound(self, **options):
+        if not self.free_variables():
+            return super(List, self).compile_bound(**options)
+
+        check_elem = self.elem_ty.compile_bound(**options)
+        copy = options.get('copy', True)
+        lazy = options.get('lazy')
+        sample = options.get('sample')
+
+        def check_list(val, bindings):
+            if type(val) is not list:
+                return self.check_buffer(val)
+
+            check = lambda x: check_elem(x, bindings)
+            if lazy:
+                return LazyList(val, check, self)
+            elif sample is not None:
+                return sample.check_list(check, val, copy=copy)
+            elif copy:
+                return check_elements(check, val)
+            else:
+                return copy_on_write_list(check, val)
+        return check_list
+
+class Iterator(Type):
+    '''
+    Any iterable, which passes through as an iterator that checks each item as it is
+    produced. Nothing is checked up front, so generators of any length can be checked
+    without consuming or holding on to them; a bad item raises when it is reached.
+    '''
+
+    __slots__ = fields = ('elem_ty',)
+
+    def __new__(cls, elem_ty):
+        return hash_cons(cls, elem_ty)
+
+    def substitute(self, substitution):
+        return Iterator(self.elem_ty.substitute(substitution))
 
+    def __str__(self):
+        return 'iter[%s]' % self.elem_ty
+
+    def free_variables(self):
+        return self.elem_ty.free_variables()
+
+    def iterate(self, val):
+        try:
+            return iter(val)
+        except TypeError:
+            raise TypeCheckError(self, val, '%(val)s is not iterable, as %(ty)s requires')
+
+    def enforce(self, val):
+        return CheckedIterator(self.iterate(val), self.elem_ty.enforce, self)
+
+    def validate(self, val):
+        return CheckedIterator(self.iterate(val), self.elem_ty.validate, self)
+
+    def compile(self, **options):
+        if isinstance(self.elem_ty, Any):
+            return self.iterate
+
+        check_item = self.elem_ty.compile(**options)
+        return lambda val: CheckedIterator(self.iterate(val), check_item, self)
+
+    def compile_bound(self, **options):
+        if not self.free_variables():
+            return super(Iterator, self).compile_bound(**options)
+
+        check_item = self.elem_ty.compile_bound(**options)
+        return lambda val, bindings: CheckedIterator(self.iterate(val), lambda x: check_item(x, bindings), self)
 
 class Dict(Type):
-    def __init__(self, key_ty, value_ty):
-        self.key_ty = key_ty
-        self.value_ty = value_ty
+    __slots__ = fields = ('key_ty', 'value_ty')
+
+    def __new__(cls, key_ty, value_ty):
+        return hash_cons(cls, key_ty, value_ty)
 
     def substitute(self, substitution):
         return Dict(key_ty=self.key_ty.substitute(substitution),
@@ -82,19 +466,84 @@ class Dict(Type):
     def __str__(self):
         return '{%s:%s}' % (self.key_ty, self.value_ty)
 
-    def __eq__(self, other):
-        return isinstance(other, Dict) and other.key_ty == self.key_ty and other.value_ty == self.value_ty
+    def free_variables(self):
+        return self.key_ty.free_variables() | self.value_ty.free_variables()
 
     def enforce(self, val):
         if type(val) != dict:
-            raise TypeError('Type check failed: %s is not a list %s' % (val, self))
+            raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+        else:
+            return dict(check_items(self.key_ty.enforce, self.value_ty.enforce, val.items()))
+
+    def validate(self, val):
+        if type(val) != dict:
+            raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+        else:
+            return copy_on_write_dict(self.key_ty.validate, self.value_ty.validate, val)
+
+    def dispatch_types(self):
+        return set([dict])
+
+    def compile(self, **options):
+        check_key = self.key_ty.compile(**options)
+        check_value = self.value_ty.compile(**options)
+
+        if options.get('lazy'):
+            def check_dict(val):
+                if type(val) is not dict:
+                    raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+                return LazyDict(val, check_key, check_value, self)
+        elif options.get('sample') is not None:
+            sample = options['sample']
+            copy = options.get('copy', True)
+            def check_dict(val):
+                if type(val) is not dict:
+                    raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+                return sample.check_dict(check_key, check_value, val, copy=copy)
+        elif options.get('copy', True):
+            def check_dict(val):
+                if type(val) is not dict:
+                    raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+                return dict(check_items(check_key, check_value, val.items()))
         else:
-            return dict([(self.key_ty.enforce(key), self.value_ty.enforce(value)) for key, value in val.items()])
+            def check_dict(val):
+                if type(val) is not dict:
+                    raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+                return copy_on_write_dict(check_key, check_value, val)
+        return check_dict
+
+    def compile_bound(self, **options):
+        if not self.free_variables():
+            return super(Dict, self).compile_bound(**options)
+
+        check_key = self.key_ty.compile_bound(**options)
+        check_value = self.value_ty.compile_bound(**options)
+        copy = options.get('copy', True)
+        lazy = options.get('lazy')
+        sample = options.get('sample')
+
+        def check_dict(val, bindings):
+            if type(val) is not dict:
+                raise TypeCheckError(self, val, '%(val)s is not a dict %(ty)s')
+
+            key = lambda k: check_key(k, bindings)
+            value = lambda v: check_value(v, bindings)
+            if lazy:
+                return LazyDict(val, key, value, self)
+            elif sample is not None:
+                return sample.check_dict(key, value, val, copy=copy)
+            elif copy:
+                return dict(check_items(key, value, val.items()))
+            else:
+                return copy_on_write_dict(key, value, val)
+        return check_dict
             
         
 class Variable(Type):
-    def __init__(self, name):
-        self.name = name
+    __slots__ = fields = ('name',)
+
+    def __new__(cls, name):
+        return hash_cons(cls, name)
 
     def substitute(self, substitution):
         if self.name in substitution:
@@ -105,107 +554,154 @@ class Variable(Type):
     def __str__(self):
         return '?%s' % self.name
 
-    def __eq__(self, other):
-        return isinstance(other, Variable) and  other.name == self.name
+    def free_variables(self):
+        return set([self.name])
 
     def enforce(self, val):
-        raise BoundVariableException(BoundVariable(self.name, val))
-
-class BoundVariable(Type):
-    def __init__(self, name, val):
-        self.name = name
-        self.val = val
-
-    def substitute(self, substitution):
-        return self
+        return val # Outside of a polymorphic function there is nothing to bind the variable to
 
-    def __str__(self):
-        return "%s:%s" % (self.name, type(self.val))
+    def compile_bound(self, **options):
+        name = self.name
 
-    def __eq__(self, other):
-        if isinstance(other, Variable):
-            return self.name == other.name
-        elif isinstance(other, BoundVariable):
-            return self.name == other.name
-        return False
-
-    def enforce(self, val):
-        if type(self.val) == type(val):
+        def check_variable(val, bindings):
+            bound_type = bindings.get(name)
+            if bound_type is None:
+                bindings[name] = type(val)
+            elif type(val) is not bound_type:
+                raise TypeCheckError(self, val, '%%(val)s is not of type %s, which %%(ty)s was bound to' % bound_type.__name__)
             return val
-        else:
-            raise TypeError('Type check failed: %s is not of type %s' % (val, type(self.val)))
-
-class BoundVariableException(BaseException):
-    def __init__(self, b):
-        self.bvar = b
+        return check_variable
 
 class Function(Type):
-    def __init__(self, arg_types, return_type, vararg_type=None, kwonly_arg_types=None, kwarg_type=None):
-        self.arg_types = arg_types
-        self.return_type = return_type
-        self.vararg_type = vararg_type 
-        self.kwarg_type = kwarg_type 
-        self.kwonly_arg_types = kwonly_arg_types
+    __slots__ = fields = ('arg_types', 'return_type', 'vararg_type', 'kwonly_arg_types', 'kwarg_type')
+
+    def __new__(cls, arg_types, return_type, vararg_type=None, kwonly_arg_types=None, kwarg_type=None):
+        return hash_cons(cls, tuple(arg_types), return_type, vararg_type,
+                         None if kwonly_arg_types is None else tuple(kwonly_arg_types), kwarg_type)
 
     def substitute(self, substitution):
         return Function(arg_types = [ty.substitute(substitution) for ty in self.arg_types],
-                            return_type = self.return_type.substitute(substitution),
+                            return_type = None if self.return_type is None else self.return_type.substitute(substitution),
                             vararg_type = None if self.vararg_type is None else self.vararg_type.substitute(substitution),
                             kwonly_arg_types = None if self.kwonly_arg_types is None else [ty.substitute(substitution) for ty in self.kwonly_arg_types],
                             kwarg_type = None if self.kwarg_type is None else self.kwarg_type.substitute(substitution))
 
     def enforce(self, f):
-        def attempt_enforce(arg_types, args, vararg_type, varargs, kwarg_type, kwargs):
-            if len(args) < len(arg_types):
-                raise TypeError('Not enough arguments (%s, needed at least %s) to %s of type %s; only received %s' % (len(args), len(arg_types), f, self, args))
-            else:
-                wrapped_args = [ty.enforce(arg) for ty, arg in zip(arg_types, args)]
-
-            if len(varargs) == 0:
-                wrapped_varargs = list(varargs)
-            elif vararg_type == None:
-                    raise TypeError('Function %s of type %s was passed varargs %s' % (f, self, varargs))
-            else:
-                wrapped_varargs = vararg_type.enforce(varargs)
-
-            if len(kwargs) == 0:
-                wrapped_kwargs = kwargs
-            elif kwarg_type == None:
-                raise TypeError('Function %s of type %s was passed kwargs %s' % (f, self, kwargs))
+        return self.compile()(f)
+
+    def free_variables(self):
+        free = set()
+        for ty in self.arg_types + (self.return_type, self.vararg_type, self.kwarg_type) + (self.kwonly_arg_types or ()):
+            if ty is not None:
+                free |= ty.free_variables()
+        return free
+
+    def compile(self, **options):
+        check = self.compile_bound(**options)
+        return lambda f: check(f, None)
+
+    def compile_bound(self, **options):
+        # The call plan: lining the arguments up with their checkers is settled here, once.
+        # Positions (or a result) of type ?? are dropped since checking them is the identity,
+        # primitive positions become inline type tests since they never need wrapping, and only
+        # the positions mentioning type variables are handed the bindings.
+        num_args = len(self.arg_types)
+        primitive_args = []
+        checked_args = []
+        bound_args = []
+        for i, ty in enumerate(self.arg_types):
+            if isinstance(ty, Any):
+                continue
+            elif isinstance(ty, NamedType) and ty.name in primitive_types:
+                primitive_args.append((i, primitive_types[ty.name], ty))
+            elif ty.free_variables():
+                bound_args.append((i, ty.compile_bound(**options)))
             else:
-                wrapped_kwargs = kwarg_type.enforce(kwargs)
-
-            return wrapped_args, wrapped_varargs, wrapped_kwargs
+                checked_args.append((i, ty.compile(**options)))
+
+        polymorphic = bool(self.free_variables())
+        check_varargs = None if self.vararg_type is None else self.vararg_type.compile_bound(**options)
+        check_kwargs = None if self.kwarg_type is None else self.kwarg_type.compile_bound(**options)
+        check_return = None if isinstance(self.return_type, Any) else self.return_type.compile_bound(**options)
+        preserve_signature = options.get('preserve_signature', True)
+        sample = options.get('sample')
+
+        # A generator function returns a generator, whatever it yields, so a return type that
+        # cannot accept one would fail every call; say so once, when the function is wrapped
+        return_types = self.return_type.dispatch_types()
+        rejects_generators = return_types is not None and types.GeneratorType not in return_types
+
+        def check_function(f, outer_bindings):
+            if rejects_generators and inspect.isgeneratorfunction(f):
+                raise TypeCheckError(self, f, '%(val)s is a generator function, so its return type in %(ty)s should be iter[...] (or ??)')
+
+            def call_with_checks(*all_args, **kwargs):
+                # Nested in a polymorphic function type, the variables belong to the enclosing call
+                if outer_bindings is not None:
+                    bindings = outer_bindings
+                elif polymorphic:
+                    bindings = {}
+                else:
+                    bindings = None
+
+                if len(all_args) < num_args:
+                    raise TypeCheckError(self, all_args, 'Not enough arguments (needed at least %d) to %s of type %%(ty)s; only received %%(val)s' % (num_args, getattr(f, '__name__', 'function')))
+
+                for i, python_type, ty in primitive_args:
+                    if type(all_args[i]) is not python_type:
+                        raise TypeCheckError(ty, all_args[i]).at('argument', i)
+
+                if len(all_args) > num_args:
+                    if check_varargs is None:
+                        raise TypeCheckError(self, all_args[num_args:], 'Function %s of type %%(ty)s was passed varargs %%(val)s' % getattr(f, '__name__', 'function'))
+                    args = list(all_args[:num_args])
+                    try:
+                        args.extend(check_varargs(list(all_args[num_args:]), bindings))
+                    except TypeCheckError as e:
+                        e.at('varargs')
+                        raise
+                elif checked_args or bound_args:
+                    args = list(all_args)
+                else:
+                    args = all_args
 
+                try:
+                    for i, check in checked_args:
+                        args[i] = check(args[i])
+
+                    for i, check in bound_args:
+                        args[i] = check(args[i], bindings)
+                except TypeCheckError as e:
+                    e.at('argument', i)
+                    raise
+
+                if kwargs:
+                    if check_kwargs is None:
+                        raise TypeCheckError(self, kwargs, 'Function %s of type %%(ty)s was passed kwargs %%(val)s' % getattr(f, '__name__', 'function'))
+                    try:
+                        kwargs = check_kwargs(kwargs, bindings)
+                    except TypeCheckError as e:
+                        e.at('kwargs')
+                        raise
+
+                if check_return is None:
+                    return f(*args, **kwargs)
+
+                result = f(*args, **kwargs)
+                try:
+                    return check_return(result, bindings)
+                except TypeCheckError as e:
+                    e.at('return')
+                    raise
 
-        def wrap_with_checks(f, *all_args, **kwargs):
-            args = all_args[:len(self.arg_types)]
-            varargs = all_args[len(self.arg_types):]
-            # TODO: Get named args right.
-            # Lining up the types and the args is probably the hardest part here.
-            # The decorator library has done similar
+            if sample is not None:
+                call_with_checks = sample.top_level(call_with_checks)
 
-            arg_types = self.arg_types
-            vararg_type = self.vararg_type
-            kwarg_type = self.kwarg_type
-            return_type = self.return_type
-            while True:
-                try:
-                    wrapped_args, wrapped_varargs, wrapped_kwargs \
-                            = attempt_enforce(arg_types, args, vararg_type, varargs, kwarg_type, kwargs)
-                    break
-                except BoundVariableException as be:
-                    b = be.bvar
-                    arg_types = [ty.substitute({b.name: b}) for ty in arg_types]
-                    return_type = return_type.substitute({b.name : b})
-                    if vararg_type != None:
-                        vararg_type.substitute({b.name : b})
-                    if kwarg_type != None:
-                        kwarg_type.substitute({b.name : b})
-
-            return return_type.enforce(f(*(wrapped_args + wrapped_varargs), **wrapped_kwargs))
-            
-        return decorator(wrap_with_checks)(f)
+            if preserve_signature:
+                return FunctionMaker.create(f, 'return _call_(%(shortsignature)s)', dict(_call_=call_with_checks), __wrapped__=f)
+            else:
+                return functools.wraps(f)(call_with_checks)
+        return check_function
 
     def __str__(self):
         comma_separated_bits = [unicode(v) for v in self.arg_types]
@@ -226,82 +722,262 @@ class Function(Type):
         
         return '%s -> %s' % (argument_list, self.return_type)
 
-    def __eq__(self, other):
-        return isinstance(other, Function) and other.vararg_type == self.vararg_type and other.kwarg_type == self.kwarg_type \
-          and other.arg_types == self.arg_types and other.kwonly_arg_types == self.kwonly_arg_types
-
 class Application(Type):
-    def __init__(self, fn, args):
-        self.fn = fn
-        self.args = args
+    __slots__ = fields = ('fn', 'args')
+
+    def __new__(cls, fn, args):
+        return hash_cons(cls, fn, tuple(args))
 
     def substitute(self, substitution):
         return Application(self.fn.substitute(substitution), [ty.substitute(substitution) for ty in self.args])
 
 class Union(Type):
-    def __init__(self, types):
-        self.types = types
+    __slots__ = fields = ('types',)
+
+    def __new__(cls, types):
+        return hash_cons(cls, tuple(types))
+
+    def substitute(self, substitution):
+        return Union([ty.substitute(substitution) for ty in self.types])
 
     def __str__(self):
         return '|'.join([str(ty) for ty in self.types])
 
-    def __eq__(self, other):
-        return isinstance(other, Union) and self.types == other.types
+    def alternatives(self):
+        "The member types, with nested unions flattened, in the order they are tried"
+        for ty in self.types:
+            if isinstance(ty, Union):
+                for alternative in ty.alternatives():
+                    yield alternative
+            else:
+                yield ty
+
+    def dispatch_types(self):
+        types = set()
+        for ty in self.alternatives():
+            if ty.dispatch_types() is None:
+                return None
+            types |= ty.dispatch_types()
+        return types
+
+    def dispatch_table(self, checkers):
+        '''
+        Given a checker for each alternative, returns a map from the exact Python type of a
+        value to the checkers worth trying for it, in order, along with the checkers to try for
+        values of any other type: those of alternatives that cannot be dispatched on.
+        '''
+        alternatives = list(self.alternatives())
+        fallback = [check for ty, check in zip(alternatives, checkers) if ty.dispatch_types() is None]
+
+        python_types = set()
+        for ty in alternatives:
+            python_types |= ty.dispatch_types() or set()
+
+        dispatch = {}
+        for python_type in python_types:
+            dispatch[python_type] = [check for ty, check in zip(alternatives, checkers)
+                                     if ty.dispatch_types() is None or python_type in ty.dispatch_types()]
+        return dispatch, fallback
 
     def enforce(self, val):
+        return self.checker()(val)
+
+    def validate(self, val):
+        return self.checker(copy=False)(val)
+
+    def free_variables(self):
+        free = set()
         for ty in self.types:
-            try:
-                return ty.enforce(val)
-            except TypeError:
-                continue
+            free |= ty.free_variables()
+        return free
+
+    def compile(self, **options):
+        dispatch, fallback = self.dispatch_table([ty.compile(**options) for ty in self.alternatives()])
 
-        raise TypeError('Type check failed: %s does not have type %s' % (val, self))
+        def check_union(val):
+            for check in dispatch.get(type(val), fallback):
+                try:
+                    return check(val)
+                except TypeError:
+                    continue
+            raise TypeCheckError(self, val)
+        return check_union
+
+    def compile_bound(self, **options):
+        if not self.free_variables():
+            return super(Union, self).compile_bound(**options)
+
+        dispatch, fallback = self.dispatch_table([ty.compile_bound(**options) for ty in self.alternatives()])
+
+        def check_union(val, bindings):
+            for check in dispatch.get(type(val), fallback):
+                # A failed alternative must not leave behind the variables it bound
+                saved = dict(bindings)
+                try:
+                    return check(val, bindings)
+                except TypeError:
+                    bindings.clear()
+                    bindings.update(saved)
+            raise TypeCheckError(self, val)
+        return check_union
 
 class Object(Type):
-    def __init__(self, self_ty_name, **field_tys):
-        self.self_ty_name = self_ty_name
-        self.field_tys = field_tys 
+    __slots__ = fields = ('self_ty_name', 'field_items')
+
+    def __new__(cls, self_ty_name, **field_tys):
+        return hash_cons(cls, self_ty_name, tuple(sorted(field_tys.items())))
+
+    @property
+    def field_tys(self):
+        return dict(self.field_items)
+
+    def substitute(self, substitution):
+        return Object(self.self_ty_name, **dict((field, ty.substitute(substitution)) for field, ty in self.field_items))
 
     def __str__(self):
         return 'object(%s)' % ','.join([self.self_ty_name] + ['%s:%s' % (name, ty) for name, ty in self.field_tys.items()])
 
-    def __eq__(self, other):
-        return isinstance(other, Object) and self.self_ty_name == other.self_ty_name and self.field_tys == other.field_tys
-
     def enforce(self, val):
         # TODO: bind the self type
-        
+        return self.enforce_fields(val, [(field, ty.enforce) for field, ty in self.field_tys.items()])
+
+    def enforce_fields(self, val, field_checkers):
         # We must have a copy with the same class, or it will break code relying on isinstance. Whether this is a "problem"
         # is debatable, but given the usual encoding of coproducts as distinct subclasses, we'd better respect it.
         newval = copy.copy(val)
         
         # Technically lets other properties slip in, but due to every object having a bunch of __foo__ props that can wait
-        for field, ty in self.field_tys.items():
-            setattr(newval, field, ty.enforce(getattr(val, field)))
+        for field, check in field_checkers:
+            setattr(newval, field, self.check_field(field, check, self.field_value(val, field)))
+        return newval
+
+    def field_value(self, val, field):
+        try:
+            return getattr(val, field)
+        except AttributeError:
+            raise TypeCheckError(self, val, '%%(val)s has no field %s of %%(ty)s' % field)
+
+    def check_field(self, field, check, field_val):
+        try:
+            return check(field_val)
+        except TypeCheckError as e:
+            e.at('field', field)
+            raise
+
+    def changed_fields(self, val, field_checkers):
+        "The (field, checked value) pairs for the fields of `val` that did not come back from their check as they were"
+        changed = []
+        for field, check in field_checkers:
+            field_val = self.field_value(val, field)
+            checked = self.check_field(field, check, field_val)
+            if checked is not field_val:
+                changed.append((field, checked))
+        return changed
+
+    def free_variables(self):
+        free = set()
+        for ty in self.field_tys.values():
+            free |= ty.free_variables()
+        return free
+
+    def validate(self, val):
+        return self.validate_fields(val, [(field, ty.validate) for field, ty in self.field_tys.items()])
+
+    def validate_fields(self, val, field_checkers):
+        "Checks every field, copying `val` only if some field came back changed"
+        changed = self.changed_fields(val, field_checkers)
+        if not changed:
+            return val
+
+        newval = copy.copy(val)
+        for field, checked in changed:
+            setattr(newval, field, checked)
         return newval
 
+    def update_fields(self, val, field_checkers):
+        "Checks every field, assigning those that came back changed onto `val` itself"
+        for field, checked in self.changed_fields(val, field_checkers):
+            setattr(val, field, checked)
+        return val
+
+    def fields_checker(self, **options):
+        "Which of the ways of checking the fields of an object the options ask for"
+        if options.get('lazy'):
+            return lambda val, field_checkers: LazyObject(val, field_checkers, self)
+        elif options.get('in_place'):
+            return self.update_fields
+        elif options.get('copy', True):
+            return self.enforce_fields
+        else:
+            return self.validate_fields
+
+    def compile(self, **options):
+        field_checkers = [(field, ty.compile(**options)) for field, ty in self.field_tys.items()]
+        fields = self.fields_checker(**options)
+        return lambda val: fields(val, field_checkers)
+
+    def compile_bound(self, **options):
+        if not self.free_variables():
+            return super(Object, self).compile_bound(**options)
+
+        field_checkers = [(field, ty.compile_bound(**options)) for field, ty in self.field_tys.items()]
+        fields = self.fields_checker(**options)
+
+        def check_object(val, bindings):
+            return fields(val, [(field, lambda x, check=check: check(x, bindings)) for field, check in field_checkers])
+        return check_object
+
 class Any(Type):
+    __slots__ = ()
+
+    def __new__(cls):
+        return hash_cons(cls)
+
     def __str__(self):
         return '??'
 
-    def __eq__(self, other):
-        return isinstance(other, Any)
-
     def substitute(self, substitution):
         return self
 
     def enforce(self, val):
         return val # In Findler-Wadler this is wrapped with ?? -> ?? but I'm not sure that works for Python
 
+    def validate(self, val):
+        return val
+
+    def compile(self, **options):
+        return lambda val: val
+
 
 # Fresh variable supply
 
-used_vars = defaultdict(lambda: 0)
+class VariableSupply(object):
+    '''
+    A supply of fresh type variables, numbered per prefix. Each supply counts on its own,
+    so an analysis given a supply of its own draws the same names on every run, whatever
+    else is running alongside it. A `namespace` is put in front of every name, keeping the
+    variables of different supplies apart when their results are merged. Drawing a
+    variable is guarded by a lock, so one supply may also be shared between threads.
+    '''
+
+    def __init__(self, namespace=''):
+        self.namespace = namespace
+        self.used_vars = defaultdict(lambda: 0)
+        self.lock = threading.Lock()
+
+    def fresh(self, prefix=None):
+        prefix = self.namespace + (prefix or 'X')
+        with self.lock:
+            self.used_vars[prefix] += 1
+            count = self.used_vars[prefix]
+        return Variable(prefix + str(count))
+
+# The supply used when none is passed explicitly
+default_supply = VariableSupply()
+used_vars = default_supply.used_vars
+
 def fresh(prefix=None):
-    global used_vars
-    prefix = prefix or 'X'
-    used_vars[prefix] = used_vars[prefix] + 1
-    return Variable(prefix + str(used_vars[prefix]))
+    return default_supply.fresh(prefix)
 
 # TODO: Give these names a definition that they can be unfolded to.
 bool_t = NamedType('bool')
@@ -0,0 +1,55 @@
+"""
+Support for checking array.array and numpy.ndarray values against list types. All the
+elements of such a buffer share the type given by its typecode or dtype, so a buffer is
+checked without visiting its elements and passes through as it is. NumPy is optional.
+"""
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The Python types the elements of an array.array come out as, by typecode
+typecode_types = {
+    'c': (str,),
+    'u': (unicode,),
+    'b': (int,),
+    'B': (int,),
+    'h': (int,),
+    'H': (int,),
+    'i': (int,),
+    'I': (long,),
+    'l': (int,),
+    'L': (long,),
+    'f': (float,),
+    'd': (float,),
+}
+
+# The Python types the elements of a numpy.ndarray correspond to, by dtype kind. Whether an integer
+# converts to an int or a long depends on its size, so integer arrays pass as either.
+dtype_kind_types = {
+    'i': (int, long),
+    'u': (int, long),
+    'f': (float,),
+    'c': (complex,),
+    'S': (str,),
+    'U': (unicode,),
+}
+
+buffer_types = [array.array] if numpy is None else [array.array, numpy.ndarray]
+
+def buffer_layout(val):
+    '''
+    The number of dimensions of `val` and the Python types of its elements, or None if `val`
+    is not a buffer. Like lists, buffers must have one of the `buffer_types` exactly, not a
+    subclass of it, since that is what unions dispatch on.
+    '''
+
+    if type(val) is array.array:
+        return 1, typecode_types[val.typecode]
+    elif numpy is not None and type(val) is numpy.ndarray:
+        return val.ndim, dtype_kind_types.get(val.dtype.kind, ())
+    else:
+        return None
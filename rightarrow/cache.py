@@ -0,0 +1,152 @@
+import weakref
+import threading
+
+# Indices into the links of the LRU ring
+PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+class LRUCache(object):
+    '''
+    A mapping that holds at most `maxsize` entries, evicting the least recently used one
+    to make room. A hit costs a dictionary lookup plus relinking one entry at the front
+    of a circular doubly linked list (the same scheme as Python 3's functools.lru_cache).
+
+    The `hits`, `misses` and `evictions` counters are cumulative; `clear` only drops the entries.
+    '''
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('LRUCache maxsize must be at least 1, not %s' % maxsize)
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._unlink(link)
+            self._link_at_front(link)
+            return link[VALUE]
+
+    def put(self, key, value):
+        with self._lock:
+            link = self._links.get(key)
+            if link is not None:
+                link[VALUE] = value
+                self._unlink(link)
+                self._link_at_front(link)
+                return
+
+            while len(self._links) >= self.maxsize:
+                oldest = self._root[PREV]
+                self._unlink(oldest)
+                del self._links[oldest[KEY]]
+                self.evictions += 1
+
+            link = [None, None, key, value]
+            self._links[key] = link
+            self._link_at_front(link)
+
+    def clear(self):
+        with self._lock:
+            self._links.clear()
+            self._root[:] = [self._root, self._root, None, None]
+
+    def __contains__(self, key):
+        return key in self._links
+
+    def __len__(self):
+        return len(self._links)
+
+    def __str__(self):
+        return 'LRUCache(size=%s, maxsize=%s, hits=%s, misses=%s, evictions=%s)' % (len(self), self.maxsize, self.hits, self.misses, self.evictions)
+
+    def _unlink(self, link):
+        link[PREV][NEXT] = link[NEXT]
+        link[NEXT][PREV] = link[PREV]
+
+    def _link_at_front(self, link):
+        root = self._root
+        newest = root[NEXT]
+        link[PREV] = root
+        link[NEXT] = newest
+        newest[PREV] = link
+        root[NEXT] = link
+
+# The types whose values can never change, and the containers that are immutable if their elements are
+immutable_atoms = frozenset([int, long, float, complex, bool, str, unicode, type(None)])
+immutable_containers = frozenset([tuple, frozenset])
+
+def deeply_immutable(val):
+    "Whether `val` and everything it contains are of the (exact) immutable types above, or namedtuples"
+    if type(val) in immutable_atoms:
+        return True
+    elif type(val) in immutable_containers or is_namedtuple(val):
+        return all(deeply_immutable(x) for x in val)
+    else:
+        return False
+
+def is_namedtuple(val):
+    "Whether `val` is an instance of a class made by `collections.namedtuple`, which has no room for other attributes"
+    cls = type(val)
+    return issubclass(cls, tuple) and hasattr(cls, '_fields') and cls.__dict__.get('__slots__') == ()
+
+class CheckCache(object):
+    '''
+    Remembers which deeply immutable values passed which checkers, by identity, so that
+    checking the same value again is a lookup: pass one to `check` as `cache=...`.
+    Only values that came back from their check as themselves are remembered.
+
+    A value that supports weak references is only remembered as long as it is alive;
+    others (tuples, strings, numbers) are kept alive by the cache, in an LRUCache of
+    `maxsize` entries. Either way an entry can never be mistaken for a different value
+    that happens to reuse the id of one that has died. `hits` and `misses` count lookups.
+    '''
+
+    def __init__(self, maxsize=1024):
+        self.pinned = LRUCache(maxsize=maxsize)
+        self.weak = {}
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, checker, val):
+        key = (checker, id(val))
+
+        ref = self.weak.get(key)
+        if ref is not None and ref() is val:
+            self.hits += 1
+            return val
+
+        if self.pinned.get(key, self) is val:
+            self.hits += 1
+            return val
+
+        self.misses += 1
+        result = checker(val)
+        if result is val and deeply_immutable(val):
+            self.remember(key, val)
+        return result
+
+    def remember(self, key, val):
+        try:
+            self.weak[key] = weakref.ref(val, lambda ref: self.weak.pop(key, None))
+        except TypeError:
+            self.pinned.put(key, val)
+
+    def clear(self):
+        self.weak.clear()
+        self.pinned.clear()
+
+    def __len__(self):
+        return len(self.weak) + len(self.pinned)
@@ -50,21 +50,27 @@ class ConstrainedEnv(object):
                      constraints = '\n\t'.join([str(c) for c in self.constraints]),
                      result      = self.return_type))
     
-def constraints(pyast, env=None):
+def constraints(pyast, env=None, supply=None):
+    '''
+    The constraints of a module, interactive session or expression. Fresh type variables are
+    drawn from `supply`, a VariableSupply, defaulting to the shared module-level one; give each
+    analysis that runs concurrently its own supply to keep its variable names deterministic.
+    '''
     env = env or {}
+    supply = supply or default_supply
     
     if isinstance(pyast, ast.Module) or isinstance(pyast, ast.Interactive):
         env = copy.copy(env)
         constraints = []
         for stmt in pyast.body:
-            cs = constraints_stmt(stmt, env=env)
+            cs = constraints_stmt(stmt, env=env, supply=supply)
             env.update(cs.env)
             constraints += cs.constraints
 
         return ConstrainedEnv(env=env, constraints=constraints)
 
     elif isinstance(pyast, ast.Expression):
-        expr_ty = constraints_expr(pyast.body, env=env)
+        expr_ty = constraints_expr(pyast.body, env=env, supply=supply)
         return ConstrainedEnv(env=env, constraints=expr_ty.constraints)
 
     else:
@@ -76,20 +82,21 @@ def extended_env(env, more_env):
     return new_env
 
 # Note that this is rather different in Python 3 - and better!
-def fn_env(arguments):
+def fn_env(arguments, supply=None):
+    supply = supply or default_supply
     new_env = {}
 
     for arg in arguments.args:
         if isinstance(arg, ast.Name) and isinstance(arg.ctx, ast.Param):
-            new_env[arg.id] = fresh() # TODO: ??
+            new_env[arg.id] = supply.fresh() # TODO: ??
         else:
             raise Exception('Arg is not a name in Param context!? %s' % arg) 
 
     if arguments.vararg:
-        new_env[arguments.vararg] = fresh() # TODO: sub/superty of list
+        new_env[arguments.vararg] = supply.fresh() # TODO: sub/superty of list
 
     if arguments.kwarg:
-        new_env[arguments.kwarg] = fresh() # TODO: sub/superty of dict
+        new_env[arguments.kwarg] = supply.fresh() # TODO: sub/superty of dict
     
     return new_env
 
@@ -101,7 +108,7 @@ def union(left, right):
     else:
         return Union([right, left])
 
-def constraints_stmt(stmt, env=None):
+def constraints_stmt(stmt, env=None, supply=None):
     """
     Since a statement may define new names or return an expression ,
     the constraints that result are in a
@@ -109,15 +116,16 @@ def constraints_stmt(stmt, env=None):
     having a return type (which is a constrained type)
     """
     env = env or {}
+    supply = supply or default_supply
     
     if isinstance(stmt, ast.FunctionDef):
-        arg_env = fn_env(stmt.args)
+        arg_env = fn_env(stmt.args, supply=supply)
 
         body_env = extended_env(env, arg_env)
         constraints = []
         return_type = None # TODO: should be fresh and constrained?
         for body_stmt in stmt.body:
-            cs = constraints_stmt(body_stmt, env=body_env)
+            cs = constraints_stmt(body_stmt, env=body_env, supply=supply)
             body_env.update(cs.env)
             constraints += cs.constraints
             return_type = union(return_type, cs.return_type)
@@ -128,28 +136,28 @@ def constraints_stmt(stmt, env=None):
         return ConstrainedEnv(env=env, constraints=constraints)
 
     elif isinstance(stmt, ast.Expr):
-        constrained_ty = constraints_expr(stmt.value, env=env)
+        constrained_ty = constraints_expr(stmt.value, env=env, supply=supply)
         return ConstrainedEnv(env=env, constraints=constrained_ty.constraints)
         
     elif isinstance(stmt, ast.Return):
         if stmt.value:
-            expr_result = constraints_expr(stmt.value, env=env)
+            expr_result = constraints_expr(stmt.value, env=env, supply=supply)
             return ConstrainedEnv(env=env, constraints=expr_result.constraints, return_type=expr_result.type)
         else:
-            result = fresh()
+            result = supply.fresh()
             return ConstrainedEnv(env=env, constraints=[Constraint(subtype=result, supertype=NamedType('NoneType'))])
 
     elif isinstance(stmt, ast.Assign):
         if len(stmt.targets) > 1:
             raise NotImplementedError('Cannot generate constraints for multi-target assignments yet')
 
-        expr_result = constraints_expr(stmt.value, env=env)
+        expr_result = constraints_expr(stmt.value, env=env, supply=supply)
         target = stmt.targets[0].id
         
         # For an assignment, we actually generate a fresh variable so that it can be the union of all things assigned
         # to it. We do not do any typestate funkiness.
         if target not in env:
-            env[target] = fresh()
+            env[target] = supply.fresh()
             
         return ConstrainedEnv(env=env, 
                               constraints = expr_result.constraints + [Constraint(subtype=expr_result.type, 
@@ -158,8 +166,9 @@ def constraints_stmt(stmt, env=None):
     else:
         raise NotImplementedError('Constraint gen for stmt %s' % stmt)
     
-def constraints_expr(expr, env=None):
+def constraints_expr(expr, env=None, supply=None):
     env = env or {}
+    supply = supply or default_supply
     
     if isinstance(expr, ast.Name) and isinstance(expr.ctx, ast.Load):
         if expr.id in ['False', 'True']: # Unlike other literals, these are actually just global identifiers
@@ -184,12 +193,12 @@ def constraints_expr(expr, env=None):
         return ConstrainedType(type=str_t)
 
     elif isinstance(expr, ast.List):
-        return ConstrainedType(type=List(elem_ty=fresh()))
+        return ConstrainedType(type=List(elem_ty=supply.fresh()))
         
     elif isinstance(expr, ast.BinOp):
-        left = constraints_expr(expr.left, env=env)
-        right = constraints_expr(expr.right, env=env)
-        ty = fresh()
+        left = constraints_expr(expr.left, env=env, supply=supply)
+        right = constraints_expr(expr.right, env=env, supply=supply)
+        ty = supply.fresh()
         
         if isinstance(expr.op, ast.Mult):
             # TODO: consider whether all types should match (forces coercions to be explicit; a good thing)
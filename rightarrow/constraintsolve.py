@@ -2,6 +2,8 @@ import sys
 import ast
 import logging
 import copy
+import weakref
+from collections import Mapping
 
 from rightarrow import constraintgen
 from rightarrow.annotations import *
@@ -25,13 +27,92 @@ class Stumper(object):
     def __str__(self):
         return 'Stumper("%s")' % self.constraint
 
+class Stumped(Exception):
+    "Raised by the solvers when some constraints cannot be decided; carries what was figured out regardless"
+
+    def __init__(self, substitution, stumpers):
+        super(Stumped, self).__init__('Got stumped by after figuring out %s, by %s' % (substitution, ', '.join(str(c) for c in stumpers)))
+        self.substitution = substitution
+        self.stumpers = stumpers
+
+# Subtyping between the built-in named types: each is a subtype of the ones after it in its chain
+subtype_chains = [
+    ['bool', 'int', 'long', 'float', 'complex'],
+    ['str'],
+    ['unicode'],
+    ['NoneType'],
+]
+
+def subtype_lattice(chains):
+    "Gives each named type a bit, and maps it to the bit set of itself and all its subtypes"
+    lattice = {}
+    for chain in chains:
+        below = 0
+        for name in chain:
+            below |= 1 << len(lattice)
+            lattice[name] = below
+    return lattice
+
+named_type_lattice = subtype_lattice(subtype_chains)
+
+# The bit sets of unions, which are immutable and interned, so each is worked out once
+union_lattice = weakref.WeakKeyDictionary()
+
+def lattice_bits(ty):
+    '''
+    The bit set of the built-in named types that are subtypes of `ty`, or None if `ty` is
+    not a built-in named type or a union of them. Then `S <: T` exactly when the bits of
+    `S` are among those of `T`.
+    '''
+    if isinstance(ty, NamedType):
+        return named_type_lattice.get(ty.name)
+
+    elif isinstance(ty, Union):
+        try:
+            return union_lattice[ty]
+        except KeyError:
+            pass
+
+        bits = 0
+        for alternative in ty.alternatives():
+            alternative_bits = lattice_bits(alternative)
+            if alternative_bits is None:
+                bits = None
+                break
+            bits |= alternative_bits
+
+        union_lattice[ty] = bits
+        return bits
+
+    else:
+        return None
+
+def is_subtype(subtype, supertype):
+    "Whether `subtype <: supertype` by the lattice of built-in named types, or, for other types, whether they are the same"
+    subtype_bits = lattice_bits(subtype)
+    supertype_bits = lattice_bits(supertype)
+    if subtype_bits is not None and supertype_bits is not None:
+        return not subtype_bits & ~supertype_bits
+    return subtype == supertype
+
 def reconcile(constraint):
     '''
     Returns an assignment of type variable names to
     types that makes this constraint satisfiable, or a Refutation
     '''
     
-    if isinstance(constraint.subtype, NamedType):
+    subtype_bits = lattice_bits(constraint.subtype)
+    supertype_bits = lattice_bits(constraint.supertype)
+    if subtype_bits is not None and supertype_bits is not None:
+        if subtype_bits & ~supertype_bits:
+            return Refutation('Not a subtype: %s' % constraint)
+        else:
+            return {}
+
+    elif isinstance(constraint.supertype, Union) and constraint.subtype in constraint.supertype.types:
+        return {}
+
+    elif isinstance(constraint.subtype, NamedType):
         if isinstance(constraint.supertype, NamedType):
             if constraint.subtype.name == constraint.supertype.name:
                 return {}
@@ -53,43 +134,218 @@ def reconcile(constraint):
         else:
             return Refutation('Cannot reconcile non-atomic type with atomic type: %s' % constraint)
 
-    elif isinstance(constraint.supertype, Union):
-        # Lots of stuff could happen here; unsure if there's research to bring to bear
-        if constraint.subtype in constraint.supertype.types:
-            return {}
-
+    # Lots of stuff could happen for other unions; unsure if there's research to bring to bear
     return Stumper(constraint)
 
+class UnionFind(object):
+    '''
+    Equivalence classes of type variable names, each of which may be bound to a type.
+    Finding the representative of a class compresses the path to it and a union hangs the
+    smaller class under the larger, so any sequence of operations takes nearly linear time.
+    '''
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+        self.bound = {} # From representatives to the types their classes are bound to
+
+    def __contains__(self, name):
+        return name in self.parent
+
+    def find(self, name):
+        parent = self.parent
+        if name not in parent:
+            parent[name] = name
+            self.size[name] = 1
+            return name
+
+        root = name
+        while parent[root] != root:
+            root = parent[root]
+
+        while parent[name] != root:
+            parent[name], name = root, parent[name]
+
+        return root
+
+    def resolve(self, name):
+        "The type the class of `name` is bound to, or None"
+        return self.bound.get(self.find(name))
+
+    def bind(self, name, ty, below=None):
+        '''
+        Binds the class of `name` to `ty` unless it is bound already, returning whether `ty`
+        agrees with the earlier binding: is a subtype of it if `below` is True (for `ty <: name`),
+        a supertype of it if `below` is False (for `name <: ty`), and the same otherwise.
+        '''
+        root = self.find(name)
+        bound = self.bound.get(root)
+        if bound is None:
+            self.bound[root] = ty
+            return True
+        elif below is None:
+            return bound == ty
+        elif below:
+            return is_subtype(ty, bound)
+        else:
+            return is_subtype(bound, ty)
+
+    def union(self, left, right):
+        '''
+        Merges the classes of the two names, unless both are bound already: then they stay
+        apart, as their bindings may differ, and this only returns whether the binding of
+        the class of `left` is a subtype of that of `right`. Otherwise returns True.
+        '''
+        left, right = self.find(left), self.find(right)
+        if left == right:
+            return True
+
+        left_ty, right_ty = self.bound.get(left), self.bound.get(right)
+        if left_ty is not None and right_ty is not None:
+            return is_subtype(left_ty, right_ty)
+
+        if self.size[left] < self.size[right]:
+            left, right = right, left
+
+        ty = self.bound.pop(right, None)
+        self.parent[right] = left
+        self.size[left] += self.size.pop(right)
+        if left not in self.bound and ty is not None:
+            self.bound[left] = ty
+        return True
+
+class Solution(Mapping):
+    "The substitution found by `solve`, which looks up the binding of a variable's class when it is read"
+
+    def __init__(self, classes):
+        self.classes = classes
+
+    def __getitem__(self, name):
+        if name in self.classes:
+            ty = self.classes.resolve(name)
+            if ty is not None:
+                return ty
+        raise KeyError(name)
+
+    def __iter__(self):
+        return (name for name in list(self.classes.parent) if self.classes.resolve(name) is not None)
+
+    def __len__(self):
+        return sum(1 for name in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 def solve(constraints):
-    remaining_constraints = copy.copy(constraints)
-    substitution = {}
+    '''
+    Returns a substitution that satisfies all the constraints, or a Refutation, handling the
+    same cases as `reconcile`. Atomic constraints are solved as they are met, through a
+    UnionFind: one between a variable and a named type binds the class of the variable, unless
+    it is bound already, in which case the two bounds are compared in the subtype lattice, and
+    one between two variables merges their classes, or compares their bindings if both are
+    bound. The rest are reconciled once at the end with their variables resolved.
+    '''
+    classes = UnionFind()
+    solution = Solution(classes)
+    between_variables = []
+    deferred = []
 
-    # Constraints that we've passed up because we don't know what to do with it;
-    # if all constraints get moved into this list then give up.
-    # Whenever progress is made, put these back in before substituting
-    stumpers = [] 
-    
-    while len(remaining_constraints) > 0:
-        constraint = remaining_constraints.pop()
+    for constraint in constraints:
+        subtype, supertype = constraint.subtype, constraint.supertype
 
-        additional_substitution = reconcile(constraint)
+        if isinstance(subtype, Variable) and isinstance(supertype, Variable):
+            between_variables.append(constraint)
+            consistent = classes.union(subtype.name, supertype.name)
+        elif isinstance(subtype, Variable) and isinstance(supertype, NamedType):
+            consistent = classes.bind(subtype.name, supertype, below=False)
+        elif isinstance(subtype, NamedType) and isinstance(supertype, Variable):
+            consistent = classes.bind(supertype.name, subtype, below=True)
+        else:
+            result = reconcile(constraint)
+            if isinstance(result, Refutation):
+                return result
+            elif isinstance(result, Stumper):
+                deferred.append(constraint)
+            continue
 
-        logger.info('reconcile(%s) ==> %s', constraint, additional_substitution)
+        if not consistent:
+            return Refutation('Not a subtype: %s' % constraint.substitute(solution))
 
-        if isinstance(additional_substitution, Stumper):
-            stumpers.append(additional_substitution.constraint)
-        elif isinstance(additional_substitution, Refutation):
-            return additional_substitution
+    stumpers = [c for c in between_variables if classes.resolve(c.subtype.name) is None]
+    for constraint in deferred:
+        substituted = constraint.substitute(solution)
+        result = reconcile(substituted)
+        logger.info('reconcile(%s) ==> %s', constraint, result)
+
+        if isinstance(result, Refutation):
+            return result
+        elif isinstance(result, Stumper):
+            stumpers.append(result.constraint)
         else:
-            remaining_constraints += stumpers
-            stumpers = []
-            substitution.update(additional_substitution)
-            remaining_constraints = [c.substitute(additional_substitution) for c in remaining_constraints]
+            for name, ty in result.items():
+                below = isinstance(substituted.supertype, Variable) and substituted.supertype.name == name
+                if not classes.bind(name, ty, below=below):
+                    return Refutation('Cannot reconcile different atomic types: %s' % constraint.substitute(solution))
 
     if len(stumpers) > 0:
-        raise Exception('Got stumped by after figuring out %s, by %s' % (substitution, stumpers)) # TODO: smarter result
+        raise Stumped(solution, stumpers) # TODO: smarter result
     else:
-        return substitution
+        return solution
+
+class WorklistSolver(object):
+    '''
+    Solves constraints by substitution. A constraint that stumps `reconcile` is parked
+    under the variables it mentions and woken up only once one of them is bound, and the
+    substitution is applied to a constraint only when it is taken off the worklist, so
+    the work done is proportional to the interactions between constraints rather than
+    to the number of constraints times the number of steps of progress.
+
+    The counters are cumulative over calls to `solve`: `reconcile_calls` is how many
+    constraints have been reconciled and `wakeups` how many parked ones were woken.
+    '''
+
+    def __init__(self):
+        self.reconcile_calls = 0
+        self.wakeups = 0
+
+    def solve(self, constraints):
+        worklist = list(reversed(constraints)) # Popping from the end takes constraints in order
+        substitution = {}
+        stumpers = {} # Parked constraints, by the number they were parked under
+        parked = {} # From variable names to the numbers of the constraints parked on them
+
+        while worklist:
+            constraint = worklist.pop().substitute(substitution)
+
+            additional_substitution = reconcile(constraint)
+            self.reconcile_calls += 1
+
+            logger.info('reconcile(%s) ==> %s', constraint, additional_substitution)
+
+            if isinstance(additional_substitution, Stumper):
+                number = self.reconcile_calls
+                stumpers[number] = constraint
+                for name in constraint.subtype.free_variables() | constraint.supertype.free_variables():
+                    parked.setdefault(name, []).append(number)
+            elif isinstance(additional_substitution, Refutation):
+                return additional_substitution
+            else:
+                substitution.update(additional_substitution)
+                for name in additional_substitution:
+                    for number in parked.pop(name, []):
+                        woken = stumpers.pop(number, None)
+                        if woken is not None:
+                            self.wakeups += 1
+                            worklist.append(woken)
+
+        if len(stumpers) > 0:
+            raise Stumped(substitution, stumpers.values()) # TODO: smarter result
+        else:
+            return substitution
+
+def solve_by_substitution(constraints):
+    "Solves the constraints with a fresh WorklistSolver; `solve` gets there faster by unifying variables"
+    return WorklistSolver().solve(constraints)
 
 if __name__ == '__main__':
     logging.basicConfig()
@@ -1,14 +1,42 @@
-
 from rightarrow.parser import Parser
-    
-def check(ty, val):
-    "Checks that `val` adheres to type `ty`"
-    
+from rightarrow.cache import LRUCache
+
+# Parsed annotations, keyed by their source text. Resize by setting `annotation_cache.maxsize`.
+annotation_cache = LRUCache(maxsize=1024)
+
+def parse(annotation):
+    "Parses the annotation string, reusing the result for repeated annotations via `annotation_cache`"
+
+    ty = annotation_cache.get(annotation)
+    if ty is None:
+        ty = Parser().parse(annotation)
+        annotation_cache.put(annotation, ty)
+    return ty
+
+def compile(ty, **options):
+    "The compiled checker for `ty`, which may be a Type or an annotation string (see `Type.compile` for the options)"
+
     if isinstance(ty, basestring):
-        ty = Parser().parse(ty)
+        ty = parse(ty)
+
+    return ty.checker(**options)
 
-    return ty.enforce(val)
+def check(ty, val, cache=None, **options):
+    """
+    Checks that `val` adheres to type `ty`. With `copy=False` only validates, handing back
+    `val` itself unless some part of it (a function or object) had to be wrapped. With
+    `in_place=True` objects are never copied, and wrapped fields are set on them directly.
+    With `lazy=True` lists and dicts come back as views that check each element when it
+    is read, and objects as proxies that check each field when it is read.
+    With `sample=` a `rightarrow.sampling` policy, only the elements it picks are checked.
+    With `cache=` a `rightarrow.cache.CheckCache`, a deeply immutable value that has
+    passed the same check before passes again without being looked at.
+    """
+    if cache is None:
+        return compile(ty, **options)(val)
+    else:
+        return cache.check(compile(ty, **options), val)
 
-def guard(ty):
+def guard(ty, **options):
     "A decorator that wraps a function so it the type passed is enforced via `check`"
-    return lambda f: check(ty, f)
+    return lambda f: check(ty, f, **options)
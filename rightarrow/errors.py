@@ -0,0 +1,71 @@
+from repr import Repr
+
+# Renders values for error messages without walking more than a bounded part of them
+value_repr = Repr()
+value_repr.maxlevel = 3
+value_repr.maxlist = value_repr.maxtuple = value_repr.maxset = value_repr.maxfrozenset = value_repr.maxdict = 10
+value_repr.maxstring = value_repr.maxother = value_repr.maxlong = 80
+
+class TypeCheckError(TypeError):
+    '''
+    Raised when a value does not adhere to a type. It carries the type, the offending value
+    and the path to where the value sits inside whatever was being checked (list indices,
+    dict keys, object fields, function arguments), outermost first.
+
+    Checks fail routinely without anyone looking at why, for example while a union tries
+    its alternatives, so the message is only rendered when the error is printed or its `args`
+    or `message` are read, and then only shows a truncated rendering of the value.
+    '''
+
+    def __init__(self, ty, val, reason='%(val)s does not have type %(ty)s'):
+        super(TypeCheckError, self).__init__()
+        self.ty = ty
+        self.val = val
+        self.reason = reason
+        self.path = []
+
+    def at(self, kind, step=None):
+        '''
+        Records that the failure happened at `step` inside the value of the enclosing check,
+        where `kind` is one of 'index', 'key', 'field', 'argument', 'varargs', 'kwargs', 'return'.
+        Called as the error propagates outwards, so steps are added innermost first. Returns
+        the error itself for convenience.
+        '''
+        self.path.insert(0, (kind, step))
+        return self
+
+    @property
+    def args(self):
+        "The rendered message, as the one argument of the error, for callers that read `e.args[0]`"
+        return (str(self),)
+
+    @property
+    def message(self):
+        return str(self)
+
+    def location(self):
+        rendered = []
+        for kind, step in self.path:
+            if kind == 'index':
+                rendered.append('[%d]' % step)
+            elif kind == 'key':
+                rendered.append('[%s]' % value_repr.repr(step))
+            elif kind == 'field':
+                rendered.append('.%s' % step)
+            elif kind == 'argument':
+                rendered.append('argument %d' % step)
+            elif kind == 'return':
+                rendered.append('return value')
+            else:
+                rendered.append(kind)
+        return ''.join(rendered)
+
+    def __str__(self):
+        message = self.reason % dict(val=value_repr.repr(self.val), ty=self.ty)
+        if self.path:
+            return 'Type check failed at %s: %s' % (self.location(), message)
+        else:
+            return 'Type check failed: %s' % message
+
+    def __repr__(self):
+        return 'TypeCheckError(%s)' % str(self)
@@ -0,0 +1,160 @@
+import sys
+import ast
+import copy
+import hashlib
+import logging
+from collections import namedtuple
+
+from rightarrow import constraintgen
+from rightarrow.cache import LRUCache
+from rightarrow.constraintsolve import Refutation, Stumped, UnionFind
+from rightarrow.normalize import Normalizer
+from rightarrow.annotations import *
+
+logger = logging.getLogger(__name__)
+
+# What one top-level statement of a module contributes: its constraints and the names it (re)binds
+Unit = namedtuple('Unit', ['constraints', 'env_updates'])
+
+def unit_key(stmt, env):
+    '''
+    Identifies the constraints of a top-level statement: its syntax, without positions, and
+    the types in `env` of the names it mentions. A statement only needs its constraints
+    generated again when this changes, which covers edits to the statement itself as well
+    as to the definitions it depends on.
+    '''
+    names = sorted(set(node.id for node in ast.walk(stmt) if isinstance(node, ast.Name)) & set(env))
+    return ast.dump(stmt), tuple((name, env[name]) for name in names)
+
+def key_namespace(key):
+    '''
+    A prefix for the type variables of a unit, derived from its key so that it is the same in
+    every process. It holds the whole digest: units whose prefixes collided would share
+    variables, and their constraints would silently be solved together.
+    '''
+    syntax, inputs = key
+    digest = hashlib.sha1(syntax + ''.join('%s:%s;' % (name, ty) for name, ty in inputs)).hexdigest()
+    return 'u%s_' % digest
+
+class IncrementalInference(object):
+    '''
+    Infers annotations for the names a module defines, again and again as the module is
+    edited, redoing only the work an edit affects. The constraints of each top-level
+    statement (usually a FunctionDef) are kept under its `unit_key`, and the solution of
+    each group of statements sharing type variables under the keys of its members, so
+    an update regenerates the constraints of changed statements and those depending on
+    them through the environment, and only solves groups that contain one of them. Both
+    are kept in LRUCaches of `cache_size` entries, so undoing an edit is cheap too.
+
+    After each `update`, `last_generated` is the number of statements whose constraints were
+    generated, `last_solved` the number of groups solved, and `last_refutations` holds the
+    Refutations of the groups that could not be solved.
+    '''
+
+    def __init__(self, cache_size=10000):
+        self.units = LRUCache(maxsize=cache_size)
+        self.solutions = LRUCache(maxsize=cache_size)
+        self.annotations = {}
+        self.last_generated = 0
+        self.last_solved = 0
+        self.last_refutations = []
+
+    def update(self, module):
+        '''
+        Infers annotations for the new version of the module, given as source or as an
+        ast.Module, and returns those that changed as a dict from each name to a pair of
+        its previous and its new annotation, with None for a name that was not defined.
+        '''
+        if isinstance(module, basestring):
+            module = ast.parse(module)
+
+        self.last_generated = 0
+        self.last_solved = 0
+        self.last_refutations = []
+
+        env = {}
+        keys = []
+        units = {}
+        for stmt in module.body:
+            key = unit_key(stmt, env)
+            unit = units.get(key) or self.units.get(key)
+            if unit is None:
+                unit = self.generate(stmt, env, key)
+                self.units.put(key, unit)
+            units[key] = unit
+            keys.append(key)
+            env.update(unit.env_updates)
+
+        substitution = {}
+        for group in self.groups(keys, units):
+            solution = self.solutions.get(group)
+            if solution is None:
+                solution = self.solve(group, units)
+                self.solutions.put(group, solution)
+
+            if isinstance(solution, Refutation):
+                self.last_refutations.append(solution)
+            else:
+                substitution.update(solution)
+
+        annotations = dict((name, ty.substitute(substitution)) for name, ty in env.items() if ty is not None)
+        changes = {}
+        for name in set(annotations) | set(self.annotations):
+            previous, current = self.annotations.get(name), annotations.get(name)
+            if previous != current:
+                changes[name] = (previous, current)
+
+        self.annotations = annotations
+        return changes
+
+    def generate(self, stmt, env, key):
+        self.last_generated += 1
+        stmt_env = copy.copy(env)
+        cs = constraintgen.constraints_stmt(stmt, env=stmt_env, supply=VariableSupply(key_namespace(key)))
+        env_updates = dict((name, ty) for name, ty in cs.env.items() if env.get(name) is not ty)
+        return Unit(constraints=cs.constraints, env_updates=env_updates)
+
+    def groups(self, keys, units):
+        "Partitions the units into groups whose constraints share no type variables, as frozensets of keys"
+        classes = UnionFind()
+        representatives = {}
+        for key in keys:
+            names = set()
+            for constraint in units[key].constraints:
+                names |= constraint.subtype.free_variables() | constraint.supertype.free_variables()
+
+            if names:
+                first = names.pop()
+                for name in names:
+                    classes.union(first, name)
+                representatives[key] = first
+            else:
+                representatives[key] = None
+
+        groups = {}
+        for key in keys:
+            first = representatives[key]
+            group = key if first is None else classes.find(first)
+            groups.setdefault(group, set()).add(key)
+        return [frozenset(group) for group in groups.values()]
+
+    def solve(self, group, units):
+        "The substitution (a dict) for a group of units, or its Refutation; what could be figured out if it is stumped"
+        self.last_solved += 1
+        constraints = [constraint for key in group for constraint in units[key].constraints]
+        try:
+            solution = Normalizer().solve(constraints)
+        except Stumped as e:
+            logger.info('%s', e)
+            solution = e.substitution
+        return solution if isinstance(solution, Refutation) else dict(solution)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    inference = IncrementalInference()
+    for filename in sys.argv[1:]:
+        with open(filename) as fh:
+            changes = inference.update(fh.read())
+        print '%s: %d statements regenerated, %d groups solved' % (filename, inference.last_generated, inference.last_solved)
+        for name, (previous, current) in sorted(changes.items()):
+            print '\t%s: %s -> %s' % (name, previous, current)
@@ -0,0 +1,185 @@
+from collections import Sequence, Mapping
+
+from rightarrow.errors import TypeCheckError
+
+class LazyList(Sequence):
+    '''
+    A read-only view of a list whose elements are checked only as they are read.
+    Each element is checked at most once; the checked (possibly wrapped) element is
+    remembered and handed back on later reads.
+    '''
+
+    def __init__(self, val, check_elem, ty):
+        self.val = val
+        self.check_elem = check_elem
+        self.ty = ty
+        self.checked = {}
+
+    def __len__(self):
+        return len(self.val)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self.val)))]
+
+        if index < 0:
+            index += len(self.val)
+
+        try:
+            return self.checked[index]
+        except KeyError:
+            pass
+
+        elem = self.val[index]
+        try:
+            checked = self.check_elem(elem)
+        except TypeCheckError as e:
+            e.at('index', index)
+            raise
+
+        self.checked[index] = checked
+        return checked
+
+    def __iter__(self):
+        for index in xrange(len(self.val)):
+            yield self[index]
+
+    def __repr__(self):
+        return 'LazyList(%r, %s)' % (self.val, self.ty)
+
+class LazyDict(Mapping):
+    '''
+    A read-only view of a dict whose keys are checked as they are iterated over or looked
+    up, and whose values are checked as they are looked up. Each is checked at most once.
+    '''
+
+    def __init__(self, val, check_key, check_value, ty):
+        self.val = val
+        self.check_key = check_key
+        self.check_value = check_value
+        self.ty = ty
+        self.checked_keys = {}
+        self.checked_values = {}
+
+    def __len__(self):
+        return len(self.val)
+
+    def checked_key(self, key):
+        try:
+            return self.checked_keys[key]
+        except KeyError:
+            pass
+
+        try:
+            checked = self.check_key(key)
+        except TypeCheckError as e:
+            e.at('key', key)
+            raise
+
+        self.checked_keys[key] = checked
+        return checked
+
+    def __getitem__(self, key):
+        try:
+            return self.checked_values[key]
+        except KeyError:
+            pass
+
+        value = self.val[key]
+        self.checked_key(key)
+        try:
+            checked = self.check_value(value)
+        except TypeCheckError as e:
+            e.at('key', key)
+            raise
+
+        self.checked_values[key] = checked
+        return checked
+
+    def __iter__(self):
+        for key in self.val:
+            yield self.checked_key(key)
+
+    def __repr__(self):
+        return 'LazyDict(%r, %s)' % (self.val, self.ty)
+
+class LazyObject(object):
+    '''
+    A proxy for an object whose annotated fields are checked when they are first read;
+    other attributes are read straight from the object. Assignments go through to the
+    object, and an assigned field is checked afresh on its next read. The proxy reports
+    the class of the object as its own, so `isinstance` answers as it would for the object.
+    '''
+
+    def __init__(self, val, field_checkers, ty):
+        object.__setattr__(self, '_val', val)
+        object.__setattr__(self, '_field_checkers', dict(field_checkers))
+        object.__setattr__(self, '_ty', ty)
+        object.__setattr__(self, '_checked', {})
+
+    @property
+    def __class__(self):
+        return self._val.__class__
+
+    def __getattr__(self, name):
+        try:
+            return self._checked[name]
+        except KeyError:
+            pass
+
+        check = self._field_checkers.get(name)
+        if check is None:
+            return getattr(self._val, name)
+
+        try:
+            value = getattr(self._val, name)
+        except AttributeError:
+            raise TypeCheckError(self._ty, self._val, '%%(val)s has no field %s of %%(ty)s' % name)
+
+        try:
+            checked = check(value)
+        except TypeCheckError as e:
+            e.at('field', name)
+            raise
+
+        self._checked[name] = checked
+        return checked
+
+    def __setattr__(self, name, value):
+        setattr(self._val, name, value)
+        self._checked.pop(name, None)
+
+    def __delattr__(self, name):
+        delattr(self._val, name)
+        self._checked.pop(name, None)
+
+    def __repr__(self):
+        return 'LazyObject(%r, %s)' % (self._val, self._ty)
+
+class CheckedIterator(object):
+    '''
+    An iterator that checks each item of the underlying iterator as it is produced,
+    holding on to nothing but the position, which a failure reports as the index.
+    '''
+
+    def __init__(self, iterator, check_item, ty):
+        self.iterator = iterator
+        self.check_item = check_item
+        self.ty = ty
+        self.index = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        item = next(self.iterator)
+        index = self.index
+        self.index += 1
+        try:
+            return self.check_item(item)
+        except TypeCheckError as e:
+            e.at('index', index)
+            raise
+
+    def __repr__(self):
+        return 'CheckedIterator(%r, %s)' % (self.iterator, self.ty)
@@ -1,10 +1,18 @@
 import sys
 import logging
+import threading
 
 import ply.lex
 
 logger = logging.getLogger(__name__)
 
+# Building a PLY lexer compiles the master regex from every `t_` rule, which is far
+# more expensive than lexing a typical annotation. The rules only depend on the class,
+# so each Lexer class builds its master lexer once per process and `tokenize` works
+# on cheap clones of it.
+_master_lexers = {}
+_master_lexers_lock = threading.Lock()
+
 class Lexer(object):
     '''
     A Lexical analyzer for Python Typelanguage.
@@ -18,7 +26,8 @@ class Lexer(object):
         Maps a string to an iterator over tokens. In other words: [char] -> [token]
         '''
         
-        new_lexer = ply.lex.lex(module=self, debug=self.debug, errorlog=logger)
+        new_lexer = self.master_lexer().clone()
+        new_lexer.lineno = 1
         new_lexer.latest_newline = 0
         new_lexer.input(string)
 
@@ -28,6 +37,22 @@ class Lexer(object):
             t.col = t.lexpos - new_lexer.latest_newline
             yield t
 
+    def master_lexer(self):
+        '''
+        The PLY lexer for this class, built on first use and shared by every instance.
+        It must only ever be cloned, never fed input directly.
+        '''
+
+        key = type(self)
+        master = _master_lexers.get(key)
+        if master is None:
+            with _master_lexers_lock:
+                master = _master_lexers.get(key)
+                if master is None:
+                    master = ply.lex.lex(module=self, debug=self.debug, errorlog=logger)
+                    _master_lexers[key] = master
+        return master
+
     # ============== PLY Lexer specification ==================
     #
     # This probably should be private but:
@@ -38,7 +63,7 @@ class Lexer(object):
 
     literals = ['|', '(', ')', '{', '}', '[', ']', ':', '*', ',', ';']
     
-    reserved_words = { 'object': 'OBJECT' }
+    reserved_words = { 'object': 'OBJECT', 'iter': 'ITER' }
 
     tokens = ['ID', 'TYVAR', 'ARROW', 'KWARG', 'ANY'] + reserved_words.values()
 
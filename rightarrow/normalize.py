@@ -0,0 +1,134 @@
+import weakref
+
+from rightarrow.constraintgen import Constraint
+from rightarrow.constraintsolve import solve, lattice_bits, Refutation, Stumped, UnionFind
+from rightarrow.annotations import *
+
+# Canonical forms of unions, which are immutable and interned, so each is worked out once
+canonical_unions = weakref.WeakKeyDictionary()
+
+def canonical(ty):
+    "`ty` with a union at the top flattened, rid of repeated members and sorted, or unwrapped if one member is left"
+    if not isinstance(ty, Union):
+        return ty
+
+    try:
+        return canonical_unions[ty]
+    except KeyError:
+        pass
+
+    alternatives = sorted(set(ty.alternatives()), key=str)
+    result = alternatives[0] if len(alternatives) == 1 else Union(alternatives)
+    canonical_unions[ty] = result
+    return result
+
+def tautology(subtype, supertype):
+    "Whether `subtype <: supertype` holds whatever its variables stand for"
+    if subtype is supertype or isinstance(supertype, Any):
+        return True
+
+    if isinstance(supertype, Union) and subtype in supertype.types:
+        return True
+
+    subtype_bits = lattice_bits(subtype)
+    supertype_bits = lattice_bits(supertype)
+    return subtype_bits is not None and supertype_bits is not None and not subtype_bits & ~supertype_bits
+
+class Normalizer(object):
+    '''
+    Shrinks a list of constraints before it is solved: both sides are put in `canonical` form,
+    tautologies are dropped, duplicates are merged, and the variables a solver would make
+    equal regardless are collapsed into one of them: variables constrained by one another both
+    ways, and the two ends of a constraint between variables that are not bound by anything
+    but variables. Ends bound by other types may take on different types in the subtype
+    lattice, so constraints between those are kept. `renaming` maps each variable collapsed by the latest `normalize` to the variable that
+    replaced it, and `expand` maps a substitution for the normalized constraints back to one
+    for the original constraints.
+
+    The counters are cumulative: `before` and `after` count constraints in and out, and
+    `tautologies`, `duplicates` and `collapsed` the constraints dropped for each reason.
+    '''
+
+    def __init__(self):
+        self.renaming = {}
+        self.before = 0
+        self.after = 0
+        self.tautologies = 0
+        self.duplicates = 0
+        self.collapsed = 0
+
+    def __str__(self):
+        return 'Normalizer(before=%s, after=%s, tautologies=%s, duplicates=%s, collapsed=%s)' % (self.before, self.after, self.tautologies, self.duplicates, self.collapsed)
+
+    def normalize(self, constraints):
+        self.before += len(constraints)
+
+        canonicals = []
+        bounded = set() # Variables with a constraint to or from something other than a variable
+        between = set() # Pairs of names of variables constrained one to the other
+        for constraint in constraints:
+            subtype, supertype = canonical(constraint.subtype), canonical(constraint.supertype)
+            if tautology(subtype, supertype):
+                self.tautologies += 1
+                continue
+
+            canonicals.append((subtype, supertype))
+            if isinstance(subtype, Variable) and isinstance(supertype, Variable):
+                between.add((subtype.name, supertype.name))
+            elif isinstance(subtype, Variable):
+                bounded.add(subtype.name)
+            elif isinstance(supertype, Variable):
+                bounded.add(supertype.name)
+
+        classes = UnionFind()
+        others = []
+        for subtype, supertype in canonicals:
+            if isinstance(subtype, Variable) and isinstance(supertype, Variable) and (
+                    (supertype.name, subtype.name) in between or not (subtype.name in bounded or supertype.name in bounded)):
+                self.collapsed += 1
+                classes.union(subtype.name, supertype.name)
+            else:
+                others.append((subtype, supertype))
+
+        self.renaming = dict((name, Variable(classes.find(name))) for name in list(classes.parent) if classes.find(name) != name)
+
+        seen = set()
+        normalized = []
+        for subtype, supertype in others:
+            if self.renaming:
+                subtype = canonical(subtype.substitute(self.renaming))
+                supertype = canonical(supertype.substitute(self.renaming))
+
+            if (subtype, supertype) in seen:
+                self.duplicates += 1
+            elif tautology(subtype, supertype):
+                self.tautologies += 1
+            else:
+                seen.add((subtype, supertype))
+                normalized.append(Constraint(subtype=subtype, supertype=supertype))
+
+        self.after += len(normalized)
+        return normalized
+
+    def expand(self, substitution):
+        "The substitution with each variable collapsed by the latest `normalize` mapped like the one that replaced it"
+        expanded = dict(substitution)
+        for name, representative in self.renaming.items():
+            if representative.name in substitution:
+                expanded[name] = substitution[representative.name]
+        return expanded
+
+    def solve(self, constraints, solver=solve):
+        '''
+        Normalizes the constraints, solves them with `solver` and expands the result. Variables
+        only ever constrained by one another are left out of the substitution, where the
+        solvers would be stumped by them.
+        '''
+        try:
+            substitution = solver(self.normalize(constraints))
+        except Stumped as e:
+            raise Stumped(self.expand(e.substitution), e.stumpers)
+
+        if isinstance(substitution, Refutation):
+            return substitution
+        return self.expand(substitution)
@@ -1,6 +1,7 @@
 import sys
 import os.path
 import logging
+import threading
 
 import ply.yacc
 
@@ -9,18 +10,51 @@ from rightarrow.lexer import Lexer
 
 logger = logging.getLogger(__name__)
 
+# Environment variable naming a directory in which to cache the generated parse tables
+# across processes. Unset means the tables are only ever kept in memory.
+PARSETAB_DIR_ENV = 'RIGHTARROW_PARSETAB_DIR'
+
+# The LALR tables depend only on the grammar, so they are generated at most once per
+# process for each Parser class and start symbol, and the resulting PLY parser is shared
+# by every instance of the class.
+_ply_parsers = {}
+_ply_parsers_lock = threading.Lock()
+
 class Parser(object):
     tokens = Lexer.tokens
 
-    def __init__(self, debug=False, lexer_class=None):
+    def __init__(self, debug=False, lexer_class=None, table_dir=None):
         self.debug = debug
         self.lexer_class = lexer_class or Lexer # Crufty but works around statefulness in PLY
+        self.table_dir = table_dir or os.environ.get(PARSETAB_DIR_ENV)
 
     def parse(self, string, lexer = None):
         lexer = lexer or self.lexer_class()
         return self.parse_token_stream(lexer.tokenize(string))
 
     def parse_token_stream(self, token_iterator, start_symbol='ty'):
+        return self.ply_parser(start_symbol).parse(lexer = IteratorToTokenStream(token_iterator))
+
+    def ply_parser(self, start_symbol='ty'):
+        """
+        The PLY parser for `start_symbol`, generated on first use and then shared
+        process-wide by every instance of this class. If `table_dir` is set, the tables
+        are read from (or written to) a pickle there so that a fresh process can skip
+        generating them. Only the instance that builds the parser gets to do so: once
+        it is built, the `table_dir` of later instances is ignored.
+        """
+
+        key = type(self), start_symbol
+        ply_parser = _ply_parsers.get(key)
+        if ply_parser is None:
+            with _ply_parsers_lock:
+                ply_parser = _ply_parsers.get(key)
+                if ply_parser is None:
+                    ply_parser = self.build_ply_parser(start_symbol)
+                    _ply_parsers[key] = ply_parser
+        return ply_parser
+
+    def build_ply_parser(self, start_symbol):
 
         # Since PLY has some crufty aspects and dumps files, we try to keep them local
         # However, we need to derive the name of the output Python file :-/
@@ -30,18 +64,23 @@ class Parser(object):
         except:
             module_name = __name__
         
-        parsing_table_module = '_'.join([module_name, start_symbol, 'parsetab'])
-
-        # And we regenerate the parse table every time; it doesn't actually take that long!
-        new_parser = ply.yacc.yacc(module=self,
-                                   debug=self.debug,
-                                   tabmodule = parsing_table_module,
-                                   outputdir = output_directory,
-                                   write_tables=0,
-                                   start = start_symbol,
-                                   errorlog = logger)
-
-        return new_parser.parse(lexer = IteratorToTokenStream(token_iterator))
+        # Subclasses may change the grammar, so their tables are named apart
+        class_name = [] if type(self) is Parser else [type(self).__name__]
+        parsing_table_module = '_'.join([module_name] + class_name + [start_symbol, 'parsetab'])
+
+        if self.table_dir:
+            picklefile = os.path.join(self.table_dir, parsing_table_module + '.pickle')
+        else:
+            picklefile = None
+
+        return ply.yacc.yacc(module=self,
+                             debug=self.debug,
+                             tabmodule = parsing_table_module,
+                             outputdir = output_directory,
+                             write_tables=0,
+                             picklefile = picklefile,
+                             start = start_symbol,
+                             errorlog = logger)
 
     # ===================== PLY Parser specification =====================
     
@@ -137,6 +176,7 @@ class Parser(object):
         bare_arg_ty : identifier_ty
                     | dict_ty
                     | list_ty
+                    | iter_ty
                     | object_ty
                     | any_ty
         """
@@ -150,6 +190,10 @@ class Parser(object):
         "list_ty : '[' ty ']'"
         p[0] = List(elem_ty=p[2])
 
+    def p_iter_ty(self, p):
+        "iter_ty : ITER '[' ty ']'"
+        p[0] = Iterator(elem_ty=p[3])
+
     def p_dict_ty(self, p):
         "dict_ty : '{' ty ':' ty '}'"
         p[0] = Dict(key_ty=p[2], value_ty=p[4])
@@ -0,0 +1,127 @@
+"""
+Infers annotations for every module in a source tree, in a pool of worker processes.
+Each module draws its type variables from a supply of its own, so the constraints of
+different modules never share a variable and solving them all together comes to the
+same as solving each module on its own. Workers therefore solve the modules they parse and
+send back only the resulting annotations, which are then merged.
+
+    python -m rightarrow.project [--jobs N] <source-root>
+"""
+
+import os
+import ast
+import time
+import logging
+import argparse
+import multiprocessing
+from collections import namedtuple
+
+from rightarrow import constraintgen
+from rightarrow.constraintsolve import Refutation, Stumped
+from rightarrow.normalize import Normalizer
+from rightarrow.annotations import *
+
+logger = logging.getLogger(__name__)
+
+# What inference made of one module: its annotations, or the error or Refutation that stopped it
+ModuleResult = namedtuple('ModuleResult', ['name', 'annotations', 'constraints', 'error', 'refutation'])
+
+ProjectReport = namedtuple('ProjectReport', ['annotations', 'errors', 'refutations', 'files', 'constraints', 'jobs', 'seconds'])
+
+def source_files(root):
+    "The paths of the Python files under `root`, in a stable order"
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield os.path.join(directory, filename)
+
+def module_name(root, path):
+    relative = os.path.splitext(os.path.relpath(path, root))[0]
+    parts = relative.split(os.sep)
+    if parts[-1] == '__init__' and len(parts) > 1:
+        parts.pop()
+    return '.'.join(parts)
+
+def infer_module(root_and_path):
+    '''
+    Parses one module, then generates and solves its constraints, drawing type variables from
+    a supply namespaced by the module name. Takes a single (root, path) pair, to suit
+    `multiprocessing.Pool.imap_unordered`.
+    '''
+    root, path = root_and_path
+    name = module_name(root, path)
+    try:
+        with open(path) as fh:
+            module = ast.parse(fh.read(), path)
+        cs = constraintgen.constraints(module, supply=VariableSupply(name.replace('.', '_') + '_'))
+    except Exception as e: # Constraint generation does not cover all of Python, so any module may fail
+        return ModuleResult(name=name, annotations={}, constraints=0, error='%s: %s' % (type(e).__name__, e), refutation=None)
+
+    try:
+        substitution = Normalizer().solve(cs.constraints)
+    except Stumped as e:
+        logger.info('%s', e)
+        substitution = e.substitution
+
+    if isinstance(substitution, Refutation):
+        return ModuleResult(name=name, annotations={}, constraints=len(cs.constraints), error=None, refutation=substitution)
+
+    annotations = dict((var, ty.substitute(substitution)) for var, ty in cs.env.items() if ty is not None)
+    return ModuleResult(name=name, annotations=annotations, constraints=len(cs.constraints), error=None, refutation=None)
+
+def infer_project(root, jobs=None):
+    '''
+    Infers annotations for the modules under `root` using `jobs` worker processes (by
+    default one per CPU; with 1, everything runs in this process) and returns a ProjectReport.
+    Its `annotations` map each module to the annotations of the names it defines.
+    '''
+    jobs = jobs or multiprocessing.cpu_count()
+    work = [(root, path) for path in source_files(root)]
+
+    start = time.time()
+    if jobs == 1:
+        results = [infer_module(item) for item in work]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = list(pool.imap_unordered(infer_module, work, chunksize=max(1, len(work) // (jobs * 4))))
+        finally:
+            pool.close()
+            pool.join()
+
+    return ProjectReport(annotations=dict((result.name, result.annotations) for result in results if result.error is None and result.refutation is None),
+                         errors=dict((result.name, result.error) for result in results if result.error is not None),
+                         refutations=dict((result.name, result.refutation) for result in results if result.refutation is not None),
+                         files=len(work),
+                         constraints=sum(result.constraints for result in results),
+                         jobs=jobs,
+                         seconds=time.time() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Infer annotations for every module under a source tree')
+    parser.add_argument('root', help='the directory to look for Python files in')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="worker processes to infer with (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    report = infer_project(args.root, jobs=args.jobs)
+
+    for name in sorted(report.annotations):
+        print name
+        for var, ty in sorted(report.annotations[name].items()):
+            print '\t%s: %s' % (var, ty)
+
+    for name in sorted(report.errors):
+        print '%s: skipped (%s)' % (name, report.errors[name])
+
+    for name in sorted(report.refutations):
+        print '%s: %s' % (name, report.refutations[name])
+
+    seconds = report.seconds or float('nan')
+    print
+    print '%d files, %d constraints with %d jobs in %.2fs: %.1f files/s, %.1f constraints/s' % (
+        report.files, report.constraints, report.jobs, report.seconds, report.files / seconds, report.constraints / seconds)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    main()
@@ -0,0 +1,131 @@
+import random
+
+from rightarrow.errors import TypeCheckError
+
+def selected(items, indices):
+    "The members of `items` at the given (ascending) indices, without materializing `items`"
+    indices = iter(indices)
+    wanted = next(indices, None)
+    for i, item in enumerate(items):
+        if wanted is None:
+            return
+        if i == wanted:
+            yield item
+            wanted = next(indices, None)
+
+class Sampling(object):
+    '''
+    A policy for checking only some of the elements of large lists and dicts, passed to
+    `check` or `guard` as `sample=...`. Elements that are not sampled are passed through
+    unchecked (and unwrapped); a sampled element that fails raises the usual TypeError.
+
+    A policy counts every list or dict it is asked to check, nested ones and failed ones included:
+    `calls` is how many there have been, `checked` the total number of elements checked
+    and `last_checked` the number checked by the most recent one. Separately, `rounds`
+    counts the finished top-level checks and guarded calls that came across any list or
+    dict (merely wrapping a function does not count); the containers nested in one all
+    belong to its round.
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.checked = 0
+        self.last_checked = 0
+        self.rounds = 0
+        self.depth = 0
+
+    def top_level(self, check):
+        "Wraps a checker or a guarded function so that each use of it not nested in another is a round of its own"
+        def check_round(*args, **kwargs):
+            calls = self.calls
+            self.depth += 1
+            try:
+                return check(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                if self.depth == 0 and self.calls != calls:
+                    self.rounds += 1
+        return check_round
+
+    def choose(self, length):
+        "The ascending indices to check in a container of the given length"
+        raise NotImplementedError()
+
+    def record(self, count):
+        self.calls += 1
+        self.checked += count
+        self.last_checked = count
+
+    def check_list(self, check_elem, val, copy=True):
+        indices = self.choose(len(val))
+        result = list(val) if copy else val
+        count = 0
+        try:
+            for i in indices:
+                elem = val[i]
+                count += 1
+                try:
+                    checked = check_elem(elem)
+                except TypeCheckError as e:
+                    e.at('index', i)
+                    raise
+                if checked is not elem:
+                    if result is val:
+                        result = list(val)
+                    result[i] = checked
+        finally:
+            self.record(count)
+        return result
+
+    def check_dict(self, check_key, check_value, val, copy=True):
+        indices = self.choose(len(val))
+        result = dict(val) if copy else val
+        count = 0
+        try:
+            for key, value in selected(val.iteritems(), indices):
+                count += 1
+                try:
+                    checked_key = check_key(key)
+                    checked_value = check_value(value)
+                except TypeCheckError as e:
+                    e.at('key', key)
+                    raise
+                if checked_key is not key or checked_value is not value:
+                    if result is val:
+                        result = dict(val)
+                    del result[key]
+                    result[checked_key] = checked_value
+        finally:
+            self.record(count)
+        return result
+
+class First(Sampling):
+    "Checks the first `k` elements (in iteration order, for dicts)"
+
+    def __init__(self, k):
+        super(First, self).__init__()
+        self.k = k
+
+    def choose(self, length):
+        return xrange(min(self.k, length))
+
+class Random(Sampling):
+    "Checks `k` elements chosen at random, from a generator seeded with `seed` for reproducibility"
+
+    def __init__(self, k, seed=None):
+        super(Random, self).__init__()
+        self.k = k
+        self.random = random.Random(seed)
+
+    def choose(self, length):
+        return sorted(self.random.sample(xrange(length), min(self.k, length)))
+
+class EveryNth(Sampling):
+    "Checks every element in every `n`th round, starting with the first, and nothing in the others"
+
+    def __init__(self, n):
+        super(EveryNth, self).__init__()
+        self.n = n
+
+    def choose(self, length):
+        return xrange(length) if self.rounds % self.n == 0 else []
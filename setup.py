@@ -22,4 +22,5 @@ setuptools.setup(
     packages = ['rightarrow'],
     test_suite = 'tests',
     install_requires = [ 'ply', 'decorator' ],
+    extras_require = { 'numpy': [ 'numpy' ] },
 )
@@ -0,0 +1,71 @@
+import unittest
+from collections import namedtuple
+
+from rightarrow.cache import LRUCache, CheckCache, deeply_immutable
+from rightarrow.enforce import check
+
+class Struct(object):
+    pass
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction_order(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1 # 'b' is now the least recently used
+        cache.put('c', 3)
+
+        assert 'b' not in cache
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.get('b') is None
+        assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+    def test_put_existing_and_clear(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('a', 2)
+        assert len(cache) == 1
+        assert cache.get('a') == 2
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.get('a', 'missing') == 'missing'
+        cache.put('b', 3)
+        assert cache.get('b') == 3
+
+class TestCheckCache(unittest.TestCase):
+
+    def test_check_cache(self):
+        cache = CheckCache(maxsize=2)
+        config = (('retries', 3), ('hosts', frozenset(['a', 'b'])))
+        assert check('??', config, cache=cache) is config
+        assert check('??', config, cache=cache) is config
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Mutable values, values that failed and values that came back copied are not remembered
+        for ty, val in [('??', (1, [2])), ('[int]', [1, 2]), ('int', 'three')]:
+            for _ in range(2):
+                try:
+                    check(ty, val, cache=cache)
+                except TypeError:
+                    pass
+        assert len(cache) == 1 and cache.hits == 1
+
+        # Values that can be weakly referenced are forgotten when they die
+        names = frozenset(['a', 'b'])
+        assert check('??', names, cache=cache) is names and len(cache) == 2
+        del names
+        assert len(cache) == 1
+
+    def test_deeply_immutable(self):
+        assert deeply_immutable((1, 2L, 3.0, 4j, True, 'five', u'six', None, frozenset([(7,)])))
+        assert not deeply_immutable((1, [2]))
+        assert not deeply_immutable(frozenset([(1, Struct())]))
+
+        Point = namedtuple('Point', ['x', 'y'])
+        class Labelled(Point):
+            pass
+        assert deeply_immutable(Point(1, (2, 3)))
+        assert not deeply_immutable(Point(1, [2])) and not deeply_immutable(Labelled(1, 2))
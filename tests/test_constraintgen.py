@@ -1,5 +1,6 @@
 import unittest
 import ast
+import threading
 
 from rightarrow import constraintgen 
 from rightarrow.annotations import *
@@ -31,3 +32,20 @@ class TestConstraintGen(unittest.TestCase):
         assert isinstance(cenv.constraints[0].supertype, Variable)
         assert cenv.return_type == None
         assert cenv.env['x'] == cenv.constraints[0].supertype
+
+    def test_variable_supplies(self):
+        program = ast.parse('def f(x, y):\n    z = [x]\n    return x * y\n')
+        first = constraintgen.constraints(program, supply=VariableSupply()).pretty()
+        assert constraintgen.constraints(program, supply=VariableSupply()).pretty() == first
+        assert 'm_X' in constraintgen.constraints(program, supply=VariableSupply('m_')).pretty()
+
+        supply = VariableSupply()
+        drawn = []
+        def draw():
+            drawn.extend([supply.fresh() for _ in xrange(1000)])
+        threads = [threading.Thread(target=draw) for _ in xrange(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(drawn)) == 4000
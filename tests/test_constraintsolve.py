@@ -0,0 +1,78 @@
+import unittest
+import ast
+
+from rightarrow import constraintgen
+from rightarrow.constraintsolve import *
+from rightarrow.annotations import *
+
+def c(subtype, supertype):
+    return constraintgen.Constraint(subtype=subtype, supertype=supertype)
+
+class TestConstraintSolve(unittest.TestCase):
+
+    def test_union_find(self):
+        classes = UnionFind()
+        assert classes.union('a', 'b') and classes.union('c', 'd')
+        assert classes.bind('d', int_t)
+        assert classes.resolve('a') is None and classes.resolve('c') == int_t
+        assert classes.union('b', 'c')
+        assert classes.resolve('a') == int_t
+        assert not classes.bind('a', str_t)
+        assert classes.bind('e', str_t) and not classes.union('e', 'a')
+
+    def test_solve(self):
+        X, Y, Z = Variable('X'), Variable('Y'), Variable('Z')
+
+        solution = solve([c(X, Y), c(Y, Z), c(int_t, X), c(Z, Union([int_t, str_t]))])
+        assert dict(solution) == {'X': int_t, 'Y': int_t, 'Z': int_t}
+        assert isinstance(solve([c(X, Y), c(int_t, X), c(Y, str_t)]), Refutation)
+        assert isinstance(solve([c(int_t, X), c(X, Union([str_t, List(str_t)]))]), Refutation)
+        self.assertRaises(Stumped, solve, [c(X, Y)])
+
+    def test_agrees_with_substitution(self):
+        program = ast.parse('a = 3\nb = a\nc = b\nd = "x"\ne = d\nb = c\n')
+        cs = constraintgen.constraints(program, supply=VariableSupply())
+        assert dict(solve(cs.constraints)) == solve_by_substitution(cs.constraints)
+        assert cs.substitute(solve(cs.constraints)).env['c'] == int_t
+
+        X = Variable('X')
+        for constraints in [[c(bool_t, X), c(X, int_t)], [c(X, int_t), c(bool_t, X)]]:
+            assert dict(solve(constraints)) == solve_by_substitution(constraints)
+
+    def test_worklist_wakes_only_affected_constraints(self):
+        X, Y, Z, W = Variable('X'), Variable('Y'), Variable('Z'), Variable('W')
+        unrelated = [c(Variable('U%d' % i), Variable('V%d' % i)) for i in range(10)]
+
+        solver = WorklistSolver()
+        self.assertRaises(Stumped, solver.solve, unrelated + [c(X, Y), c(Y, Z), c(int_t, X)])
+        assert solver.wakeups == 2 # X <: Y is woken by X, then Y <: Z by Y; the others stay parked
+        assert solver.reconcile_calls == 15
+
+        solver = WorklistSolver()
+        assert solver.solve([c(Z, W), c(X, Y), c(Y, Z), c(int_t, X)]) == {'X': int_t, 'Y': int_t, 'Z': int_t, 'W': int_t}
+        assert solver.wakeups == 3 and solver.reconcile_calls == 7
+
+    def test_subtype_lattice(self):
+        for subtype, supertype in [(bool_t, int_t), (int_t, complex_t), (bool_t, numeric_t), (Union([int_t, float_t]), numeric_t),
+                                   (Union([bool_t, long_t]), Union([float_t, str_t])), (str_t, Union([unicode_t, str_t]))]:
+            assert reconcile(c(subtype, supertype)) == {}
+
+        for subtype, supertype in [(float_t, int_t), (str_t, unicode_t), (str_t, numeric_t), (numeric_t, long_t),
+                                   (Union([int_t, str_t]), numeric_t)]:
+            assert isinstance(reconcile(c(subtype, supertype)), Refutation)
+
+        X = Variable('X')
+        assert isinstance(reconcile(c(X, numeric_t)), Stumper)
+        assert dict(solve([c(X, numeric_t), c(bool_t, X)])) == {'X': bool_t}
+        assert dict(solve([c(bool_t, X), c(X, int_t)])) == {'X': bool_t}
+        assert isinstance(solve([c(float_t, X), c(X, int_t)]), Refutation)
+
+        Y = Variable('Y')
+        assert not isinstance(solve([c(bool_t, X), c(int_t, Y), c(X, Y)]), Refutation)
+        assert isinstance(solve([c(float_t, X), c(int_t, Y), c(X, Y)]), Refutation)
+
+        for constraints in [[c(float_t, Y), c(int_t, X), c(X, Y)], [c(int_t, X), c(float_t, Y), c(X, Y)]]:
+            solution = solve(constraints)
+            assert dict(solution) == solve_by_substitution(constraints) == {'X': int_t, 'Y': float_t}
+            for constraint in constraints:
+                assert reconcile(constraint.substitute(solution)) == {}
@@ -1,9 +1,18 @@
 import unittest
 import ast
+import array
 
-from rightarrow.enforce import check
+from rightarrow import sampling
+from rightarrow.enforce import check, compile, guard, annotation_cache
+from rightarrow.parser import Parser
+from rightarrow.errors import TypeCheckError
 from rightarrow.annotations import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class Struct:
     def __init__(self, **entries): 
         self.__dict__.update(entries)
@@ -74,3 +83,323 @@ class TestEnforce(unittest.TestCase):
             except TypeError:
                 continue
 
+
+    def test_annotation_cache(self):
+        annotation_cache.clear()
+        hits = annotation_cache.hits
+
+        check('{str: [int]}', {'a': [1]})
+        check('{str: [int]}', {'b': [2, 3]})
+
+        assert len(annotation_cache) == 1
+        assert annotation_cache.hits == hits + 1
+
+    def test_compiled_matches_enforce(self):
+        cases = [
+            ('int', 3),
+            ('int', "hello"),
+            ('[int]', [1, 2, 3]),
+            ('[int]', [1, "two"]),
+            ('[??]', [1, "two"]),
+            ('{str: [int|str]}', {'a': [1, "b"]}),
+            ('{str: [int]}', {'a': [1, "b"]}),
+            ('[{str: float}]', [{}, {'a': 2.5}]),
+            ('object(self, foo:[int])', Struct(foo=[3])),
+            ('object(self, foo:[int])', Struct(foo=["hello"])),
+        ]
+
+        for ty, val in cases:
+            ty = Parser().parse(ty)
+            try:
+                expected = ty.enforce(val)
+            except TypeError:
+                self.assertRaises(TypeError, ty.compile(), val)
+            else:
+                result = ty.compile()(val)
+                if isinstance(result, Struct):
+                    assert result.__dict__ == expected.__dict__
+                else:
+                    assert result == expected
+
+    def test_compiled_function(self):
+        f = compile('(int, *[str]) -> int')(lambda x, *rest: x + len(rest))
+        assert f(1) == 1
+        assert f(1, 'a', 'b') == 3
+        self.assertRaises(TypeError, f, 'one')
+        self.assertRaises(TypeError, f, 1, 2)
+
+
+    def test_validate_only(self):
+        unchanged = [
+            ('[int]', [1, 2, 3]),
+            ('[??]', [1, "two"]),
+            ('[[float]]', [[1.5], []]),
+            ('{str: [int|str]}', {'a': [1, "b"]}),
+            ('object(self, foo:[int])', Struct(foo=[3])),
+        ]
+
+        for ty, val in unchanged:
+            assert check(ty, val, copy=False) is val
+            assert Parser().parse(ty).validate(val) is val
+            assert check(ty, val) is not val
+
+        for ty, val in [('[int]', [1, "two"]), ('{str: int}', {'a': "b"}), ('object(self, foo:int)', Struct(foo="b"))]:
+            self.assertRaises(TypeError, check, ty, val, copy=False)
+
+        # Only the containers around a wrapped function are rebuilt
+        fs = {'f': lambda x: x, 'g': lambda x: x}
+        vals = [1, fs]
+        checked = check('[int|{str: int -> int}]', vals, copy=False)
+        assert checked is not vals and checked[0] == 1 and checked[1] is not fs
+        assert sorted(checked[1].keys()) == ['f', 'g']
+        self.assertRaises(TypeError, checked[1]['g'], 'hello')
+
+    def test_lazy(self):
+        checked = check('[int]', [1, "two", 3], lazy=True)
+        assert len(checked) == 3
+        assert checked[0] == 1 and checked[-1] == 3
+        try:
+            checked[1]
+        except TypeError as e:
+            assert e.path == [('index', 1)]
+        else:
+            assert False, 'Expected a TypeError'
+
+        # Nested containers are lazy too, and each element is checked only once
+        calls = []
+        def f(x):
+            calls.append(x)
+            return x
+        checked = check('{str: [int -> int]}', {'fs': [f]}, lazy=True)
+        fs = checked['fs']
+        assert fs[0] is fs[0]
+        assert fs[0](3) == 3 and calls == [3]
+        self.assertRaises(TypeError, fs[0], 'three')
+
+        checked = check('{str: int}', {'a': 1, 2: 'b'}, lazy=True)
+        assert checked['a'] == 1
+        self.assertRaises(TypeError, lambda: checked[2])
+        self.assertRaises(TypeError, list, checked)
+
+        self.assertRaises(TypeError, check, '[int]', (1, 2), lazy=True)
+
+    def test_object_modes(self):
+        ty = Object('self', foo=Function([int_t], int_t), bar=str_t)
+        f = lambda x: x
+        val = Struct(foo=f, bar='x')
+
+        # Validating copies only when a field gets wrapped; in place never copies
+        plain = Struct(foo=3)
+        assert check('object(self, foo:int)', plain, copy=False) is plain
+        assert check('object(self, foo:int)', plain, in_place=True) is plain
+        checked = check(ty, val, in_place=True)
+        assert checked is val and val.foo is not f
+        self.assertRaises(TypeError, val.foo, 'x')
+
+        # A proxy checks (and wraps) each field on first read, and passes isinstance
+        val = Struct(foo=f, bar=3, baz='unchecked')
+        proxy = check(ty, val, lazy=True)
+        assert isinstance(proxy, Struct)
+        assert proxy.baz == 'unchecked'
+        assert proxy.foo is proxy.foo and proxy.foo(2) == 2
+        self.assertRaises(TypeError, proxy.foo, 'x')
+        try:
+            proxy.bar
+        except TypeCheckError as e:
+            assert e.path == [('field', 'bar')]
+        else:
+            assert False, 'Expected a TypeError'
+
+        proxy.bar = 'fixed'
+        assert proxy.bar == 'fixed' and val.bar == 'fixed'
+        self.assertRaises(TypeError, getattr, check(ty, Struct(), lazy=True), 'foo')
+
+    def test_buffers(self):
+        floats = array.array('d', [1.5, 2.5])
+        assert check('[float]', floats) is floats
+        assert check('[float|str]', floats, copy=False) is floats
+        assert check('[[int]]', [array.array('i', [1]), [2]]) == [array.array('i', [1]), [2]]
+        self.assertRaises(TypeError, check, '[int]', floats)
+        self.assertRaises(TypeError, check, '[[float]]', floats)
+
+        # Subclasses are no buffers, inside a union or not
+        class Floats(array.array): pass
+        subclassed = Floats('d', [1.5])
+        assert check('[float]|str', floats) is floats
+        self.assertRaises(TypeError, check, '[float]', subclassed)
+        self.assertRaises(TypeError, check, '[float]|str', subclassed)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_arrays(self):
+        matrix = numpy.zeros((3, 2), dtype='int32')
+        assert check('[[int]]', matrix) is matrix
+        assert check('[[??]]', matrix, lazy=True) is matrix
+        assert check('[float]|[[long]]', matrix) is matrix
+        self.assertRaises(TypeError, check, '[int]', matrix)
+        self.assertRaises(TypeError, check, '[[float]]', matrix)
+        self.assertRaises(TypeError, check, '[[int]]', numpy.array([[object()]]))
+
+        masked = numpy.ma.masked_array([1.5, 2.5])
+        self.assertRaises(TypeError, check, '[float]', masked)
+        self.assertRaises(TypeError, check, '[float]|str', masked)
+
+    def test_iterators(self):
+        consumed = []
+        def numbers():
+            for x in [1, 2, 'three', 4]:
+                consumed.append(x)
+                yield x
+
+        checked = check('iter[int]', numbers())
+        assert consumed == []
+        assert next(checked) == 1 and next(checked) == 2
+        try:
+            next(checked)
+        except TypeCheckError as e:
+            assert e.path == [('index', 2)]
+        else:
+            assert False, 'Expected a TypeError'
+        assert consumed == [1, 2, 'three']
+
+        assert list(check('iter[int]', xrange(3))) == [0, 1, 2]
+        self.assertRaises(TypeError, check, 'iter[int]', 3)
+
+        # Items are checked against the bindings of the call that produced them
+        first = guard('[~a] -> iter[~a]')(lambda xs: iter([xs[0], 'x']))
+        items = first([1])
+        assert next(items) == 1
+        self.assertRaises(TypeError, next, items)
+
+        # Arguments of generator functions are checked on the call, items as they are yielded
+        def count_to(n):
+            for i in xrange(n):
+                yield i
+        self.assertRaises(TypeError, guard('int -> iter[int]')(count_to), 'three')
+        assert list(guard('int -> iter[int]')(count_to)(3)) == [0, 1, 2]
+        self.assertRaises(TypeError, guard('int -> [int]'), count_to)
+
+    def test_sampling(self):
+        rows = [{'a': 1.5}] * 100 + [{'a': 'bad'}]
+
+        first = sampling.First(10)
+        assert check('[{str: float}]', rows, sample=first) == rows
+        assert first.calls == 11 # The list and the ten dicts in it
+        assert first.last_checked == 10 and first.checked == 20
+
+        self.assertRaises(TypeError, check, '[{str: float}]', rows, sample=sampling.Random(101, seed=1))
+
+        every_other = sampling.EveryNth(2)
+        f = check('[int] -> int', lambda xs: len(xs), sample=every_other)
+        self.assertRaises(TypeError, f, [1, 'two'])
+        assert f([1, 'two']) == 2
+        assert every_other.calls == 2 and every_other.checked == 2
+        assert every_other.rounds == 2
+
+        # Nested containers follow the round of the check they are in
+        every_other = sampling.EveryNth(2)
+        rows = [{'a': 1.5}, {'a': 'bad'}, {'a': 2.5}]
+        for i in range(4):
+            if i % 2 == 0:
+                self.assertRaises(TypeError, check, '[{str: float}]', rows, sample=every_other)
+            else:
+                assert check('[{str: float}]', rows, sample=every_other) == rows
+        assert every_other.rounds == 4 and every_other.calls == 8 and every_other.checked == 8
+
+        # Checkers for sampled checks are not kept around
+        ty = Parser().parse('[int]')
+        for i in range(10):
+            check(ty, [1, 2], sample=sampling.First(1))
+        assert not any(dict(key).get('sample') for key in getattr(ty, '_checkers', {}))
+
+        # Sampled elements are still wrapped
+        originals = [lambda x: x, lambda x: x]
+        fs = check('[int -> int]', originals, sample=sampling.Random(1, seed=3), copy=False)
+        assert fs is not originals
+        assert len([f for f, original in zip(fs, originals) if f is not original]) == 1
+
+    def test_guard_call_plan(self):
+        import inspect
+
+        @guard('(int, ??, *[str], **{str: int}) -> ??')
+        def f(x, y, *rest, **kwargs):
+            return (x, y, rest, kwargs)
+
+        assert f.__name__ == 'f'
+        assert inspect.getargspec(f) == inspect.getargspec(f.__wrapped__)
+        assert f(1, 'anything', 'a', b=2) == (1, 'anything', ('a',), {'b': 2})
+        self.assertRaises(TypeError, f, 'one', 2)
+        self.assertRaises(TypeError, f, 1, 2, 3)
+        self.assertRaises(TypeError, f, 1, 2, b='two')
+
+        g = guard('int -> int', preserve_signature=False)(lambda x: x)
+        assert g(3) == 3
+        self.assertRaises(TypeError, g, 'three')
+        self.assertRaises(TypeError, g)
+
+    def test_polymorphic_functions(self):
+        identity = check('~a -> ~a', lambda x: x)
+        assert identity(3) == 3 and identity("three") == "three" # Each call binds afresh
+
+        self.assertRaises(TypeError, check('~a -> ~a', lambda x: str(x)), 3)
+
+        f = check('(~a, ~b, [~a]) -> ~b', lambda a, b, xs: b)
+        assert f(1, "b", [2, 3]) == "b"
+        self.assertRaises(TypeError, f, 1, "b", [2, "three"])
+
+        # A nested function type shares the variables of the enclosing call
+        apply = check('(~a -> ~a, ~a) -> ~a', lambda g, x: g(x))
+        assert apply(lambda x: x + 1, 1) == 2
+        self.assertRaises(TypeError, apply, lambda x: str(x), 1)
+
+        # A failed union alternative does not leave its bindings behind
+        g = check('({~a: int}|~a, ~a) -> int', lambda d, y: 1)
+        assert g({'k': 'v'}, {}) == 1
+
+    def test_union_dispatch(self):
+        ty = Parser().parse('int|long|float|[str]|{str: int}|(object(self, foo:int)|[int])')
+        dispatch, fallback = ty.dispatch_table(list(ty.alternatives()))
+        assert [alt for alt in fallback] == [Object('self', foo=int_t)]
+        assert dispatch[int] == [int_t, Object('self', foo=int_t)]
+        assert dispatch[list] == [List(str_t), Object('self', foo=int_t), List(int_t)]
+
+        assert check(ty, [1, 2]) == [1, 2]
+        assert check(ty, {'a': 1}) == {'a': 1}
+        assert check(ty, Struct(foo=2)).foo == 2
+        self.assertRaises(TypeError, check, 'int|str', 2.5)
+        self.assertRaises(TypeError, check, 'int|[int]', ['one'])
+
+    def test_error_paths(self):
+        cases = [
+            ('int', "hello", [], 'Type check failed: \'hello\' does not have type int'),
+            ('[int]', [1, 2, "three"], [('index', 2)], 'Type check failed at [2]: \'three\' does not have type int'),
+            ('[[float]]', [[1.5], [2.5, 3]], [('index', 1), ('index', 1)], None),
+            ('{str: [int]}', {'a': [1, "b"]}, [('key', 'a'), ('index', 1)], "Type check failed at ['a'][1]: 'b' does not have type int"),
+            ('object(self, foo:[int])', Struct(foo=["x"]), [('field', 'foo'), ('index', 0)], None),
+            ('[int|str]', [1, 2.5], [('index', 1)], None),
+        ]
+
+        for ty, val, path, message in cases:
+            for options in [{}, {'copy': False}]:
+                try:
+                    check(ty, val, **options)
+                except TypeCheckError as e:
+                    assert e.path == path
+                    assert message is None or str(e) == message
+                    assert e.args == (str(e),) and e.message == str(e)
+                else:
+                    assert False, 'Expected a TypeCheckError'
+
+        f = check('(int, [str]) -> [int]', lambda x, ys: ys)
+        for args, path in [(("1", []), [('argument', 0)]), ((1, [2]), [('argument', 1), ('index', 0)]), ((1, ["a"]), [('return', None), ('index', 0)])]:
+            try:
+                f(*args)
+            except TypeCheckError as e:
+                assert e.path == path
+            else:
+                assert False, 'Expected a TypeCheckError'
+
+    def test_error_messages_are_truncated(self):
+        try:
+            check('int', range(100000))
+        except TypeCheckError as e:
+            assert len(str(e)) < 200
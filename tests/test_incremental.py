@@ -0,0 +1,50 @@
+import unittest
+
+from rightarrow.incremental import IncrementalInference
+from rightarrow.annotations import *
+
+source = '''
+x = 3
+y = x
+
+def f(a, b):
+    return a
+
+def g(a):
+    z = y
+    return z
+
+def h():
+    return "h"
+'''
+
+class TestIncremental(unittest.TestCase):
+
+    def test_update(self):
+        inference = IncrementalInference()
+        changes = inference.update(source)
+        assert inference.last_generated == 5
+        assert changes['x'] == (None, int_t)
+        assert changes['g'][1].return_type == int_t
+        assert changes['h'] == (None, Function([], str_t))
+
+        # Nothing changed, so there is nothing to do
+        assert inference.update('\n\n' + source) == {}
+        assert inference.last_generated == 0 and inference.last_solved == 0
+
+        # Changing x reaches g through y, but not f or h
+        changes = inference.update(source.replace('x = 3', 'x = "three"'))
+        assert inference.last_generated == 3
+        assert sorted(changes) == ['g', 'x', 'y']
+        assert changes['g'][1].return_type == str_t
+
+        changes = inference.update(source.replace('return "h"', 'return 4').replace('def g', 'def k'))
+        assert changes['h'][1] == Function([], int_t)
+        assert changes['g'][1] is None and changes['k'][0] is None
+        assert inference.last_generated == 2 # x and y are as they were at first, which is still cached
+
+    def test_refutations(self):
+        inference = IncrementalInference()
+        inference.update('x = 3\nx = "three"\ny = 4\n')
+        assert len(inference.last_refutations) == 1
+        assert inference.annotations['y'] == int_t
@@ -0,0 +1,66 @@
+import unittest
+import ast
+
+from rightarrow import constraintgen
+from rightarrow.normalize import Normalizer, canonical
+from rightarrow.constraintsolve import solve, solve_by_substitution, Refutation, Stumped, WorklistSolver
+from rightarrow.annotations import *
+
+def c(subtype, supertype):
+    return constraintgen.Constraint(subtype=subtype, supertype=supertype)
+
+class TestNormalize(unittest.TestCase):
+
+    def test_canonical(self):
+        assert canonical(Union([Union([str_t, int_t]), int_t])) is Union([int_t, str_t])
+        assert canonical(Union([int_t, int_t])) is int_t
+
+    def test_normalize(self):
+        X, Y, Z, W = Variable('X'), Variable('Y'), Variable('Z'), Variable('W')
+        normalizer = Normalizer()
+        normalized = normalizer.normalize([c(X, X), c(bool_t, numeric_t), c(X, Y), c(Y, Z), c(Z, Y), c(X, numeric_t), c(Y, numeric_t),
+                                           c(Z, Union([float_t, long_t, int_t, complex_t])), c(int_t, Y), c(W, Any())])
+        assert len(normalizer.renaming) == 1
+        R = normalizer.renaming.values()[0] # Whichever of Y and Z stands for the other
+        assert sorted(normalizer.renaming) + [R.name] in [['Y', 'Z'], ['Z', 'Y']]
+        assert [(n.subtype, n.supertype) for n in normalized] == [(X, R), (X, canonical(numeric_t)), (R, canonical(numeric_t)), (int_t, R)]
+        assert (normalizer.before, normalizer.after) == (10, 4)
+        assert (normalizer.tautologies, normalizer.duplicates, normalizer.collapsed) == (3, 1, 2)
+
+        # Variables bound only by other variables are collapsed too
+        normalizer = Normalizer()
+        normalized = normalizer.normalize([c(int_t, X), c(X, Y), c(Y, Z), c(Z, W), c(W, float_t)])
+        assert [(n.subtype, n.supertype) for n in normalized] in [[(int_t, X), (X, R), (R, W), (W, float_t)] for R in [Y, Z]]
+        assert normalizer.collapsed == 1
+
+    def test_solve(self):
+        program = ast.parse('a = 3\nb = a\nc = b\nd = "x"\ne = d\nb = c\n')
+        cs = constraintgen.constraints(program, supply=VariableSupply())
+        expected = dict(solve(cs.constraints))
+        assert Normalizer().solve(cs.constraints) == expected
+        assert Normalizer().solve(cs.constraints, solver=WorklistSolver().solve) == expected
+
+        X, Y = Variable('X'), Variable('Y')
+        assert Normalizer().solve([c(X, Y)]) == {}
+        try:
+            Normalizer().solve([c(X, Y), c(int_t, X), c(Union([Y, str_t]), Variable('Z'))])
+        except Stumped as e:
+            assert e.substitution == {'X': int_t, 'Y': int_t}
+        else:
+            assert False, 'Expected to be stumped'
+
+    def test_agrees_with_substitution(self):
+        X, Y, Z = Variable('X'), Variable('Y'), Variable('Z')
+        for constraints in [[c(int_t, X), c(float_t, Y), c(X, Y)],
+                            [c(X, Y), c(float_t, Y), c(int_t, X)],
+                            [c(bool_t, X), c(X, Y), c(Y, Z), c(Z, float_t)],
+                            [c(int_t, X), c(X, Y), c(Y, X)],
+                            [c(float_t, X), c(X, Y), c(Y, Z), c(Z, int_t)],
+                            [c(int_t, X), c(float_t, Y), c(Y, X)]]:
+            expected = solve_by_substitution(constraints)
+            for solver in [solve, WorklistSolver().solve]:
+                result = Normalizer().solve(constraints, solver=solver)
+                if isinstance(expected, Refutation):
+                    assert isinstance(result, Refutation)
+                else:
+                    assert dict(result) == expected
@@ -1,8 +1,13 @@
 import unittest
 import ast
+import copy
+import pickle
+import os
+import shutil
+import tempfile
 
 from rightarrow.lexer import Lexer
-from rightarrow.parser import Parser
+from rightarrow.parser import Parser, IteratorToTokenStream
 from rightarrow.annotations import *
 
 class TestParser(unittest.TestCase):
@@ -43,6 +48,8 @@ class TestParser(unittest.TestCase):
 
             ('~a -> ~a', Function([Variable('a')], Variable('a'))),
 
+            ('iter[[int]]', Iterator(List(int_t))),
+
             ('object(self)', Object('self')),
             ('object(self, foo:int)', Object('self', foo=NamedType('int')))
         ]
@@ -50,3 +57,49 @@ class TestParser(unittest.TestCase):
         for string, parsed in test_cases:
             print string, '=?=', parsed # pytest captures this and we see it only on a failure, for debugging
             assert parser.parse(string) == parsed
+
+    def test_tables_are_shared(self):
+        assert Parser().ply_parser('ty') is Parser(debug=True).ply_parser('ty')
+        assert Lexer().master_lexer() is Lexer(debug=True).master_lexer()
+
+        class SubParser(Parser): pass
+        assert SubParser().ply_parser('ty') is not Parser().ply_parser('ty')
+        assert SubParser().ply_parser('ty') is SubParser().ply_parser('ty')
+
+    def test_table_dir(self):
+        table_dir = tempfile.mkdtemp()
+        try:
+            parser = Parser(table_dir=table_dir)
+            parser.build_ply_parser('ty')
+            assert os.listdir(table_dir) == ['parser_ty_parsetab.pickle']
+
+            # The second build reads the pickled tables back in
+            assert parser.build_ply_parser('ty').parse(lexer=IteratorToTokenStream(Lexer().tokenize('[int]'))) == List(int_t)
+        finally:
+            shutil.rmtree(table_dir)
+
+        # Through the shared parsers, only the first build of a class sees a table_dir
+        class TableDirParser(Parser): pass
+        table_dir, later_table_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        try:
+            TableDirParser(table_dir=table_dir).ply_parser('ty')
+            assert os.listdir(table_dir) == ['parser_TableDirParser_ty_parsetab.pickle']
+            assert TableDirParser(table_dir=later_table_dir).parse('[int]') == List(int_t)
+            assert os.listdir(later_table_dir) == []
+        finally:
+            shutil.rmtree(table_dir)
+            shutil.rmtree(later_table_dir)
+
+    def test_types_are_interned(self):
+        parser = Parser()
+        ty = parser.parse('object(self, foo:[int]) -> {str:~a}|??')
+        assert ty is parser.parse('object(self, foo:[int]) -> {str:~a}|??')
+        assert ty is Function([Object('self', foo=List(int_t))], Union([Dict(str_t, Variable('a')), Any()]))
+        assert Function([int_t], int_t) != Function([int_t], str_t)
+
+        checked = {ty: 'checked'}
+        assert checked[Function([Object('self', foo=List(int_t))], Union([Dict(str_t, Variable('a')), Any()]))] == 'checked'
+
+        self.assertRaises(AttributeError, setattr, ty, 'return_type', int_t)
+        assert copy.deepcopy(ty) is ty
+        assert pickle.loads(pickle.dumps(ty)) is ty
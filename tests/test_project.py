@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rightarrow.project import infer_project
+from rightarrow.annotations import *
+
+class TestProject(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'pkg'))
+        for path, source in [('pkg/__init__.py', ''),
+                             ('pkg/numbers.py', 'x = 3\ny = x\ndef f(a):\n    return y\n'),
+                             ('strings.py', 'def s():\n    return "s"\n'),
+                             ('broken.py', 'import os\n')]:
+            with open(os.path.join(self.root, path), 'w') as fh:
+                fh.write(source)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_infer_project(self):
+        for jobs in [1, 2]:
+            report = infer_project(self.root, jobs=jobs)
+            assert report.files == 4 and report.jobs == jobs
+            assert report.annotations['pkg.numbers']['y'] == int_t
+            assert report.annotations['pkg.numbers']['f'].return_type == int_t
+            assert report.annotations['strings'] == {'s': Function([], str_t)}
+            assert report.annotations['pkg'] == {}
+            assert list(report.errors) == ['broken']
+            assert report.refutations == {}
+
+    def test_refutations(self):
+        with open(os.path.join(self.root, 'strings.py'), 'w') as fh:
+            fh.write('x = 3\nx = "three"\n')
+        report = infer_project(self.root, jobs=1)
+        assert list(report.refutations) == ['strings'] and 'strings' not in report.annotations
+        assert report.annotations['pkg.numbers']['y'] == int_t